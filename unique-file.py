@@ -3,22 +3,49 @@
 
 from random import getrandbits
 from random import randint
-from hashlib import sha224
+from hashlib import sha224, sha256, sha512
+from fractions import gcd
+from binascii import hexlify, unhexlify
+from itertools import chain, islice
+from collections import OrderedDict, deque
+from cStringIO import StringIO
+import multiprocessing
+import random
+import Queue
+import atexit
+import cProfile
+import SocketServer
+import socket
+import threading
+import hmac
+import json
+import mmap
+import subprocess
 import re
+import shutil
+import tempfile
+import time
+import struct
+import functools
+import fcntl
 import os.path
 import os
 import math
 import sys
 
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
 # ============================================ Funções ============================================  #
 
-# @Brief Exponenciação modular
+# @Brief Exponenciação modular (binária, da direita para a esquerda)
 # @Arg1 -> Base a ser testada
 # @Arg2 -> Expoente da base
 # @Arg3 -> Valor do módulo
-# @Arg4 -> Resto (padrão/inicial
 # @Return -> Resultado da exponenciação modular
-def expMod(base, exp, mod):
+def expModBinary(base, exp, mod):
     rest = 1
     while exp:
         if exp & 1:
@@ -27,15 +54,164 @@ def expMod(base, exp, mod):
         base = base * base % mod
     return rest
 
-# @Brief MDC
+# Tamanho da janela (em bits) das tabelas de base fixa e quantidade de tabelas mantidas em memória
+FIXED_BASE_WINDOW = 4
+FIXED_BASE_CACHE_SIZE = 8
+FIXED_BASE_TABLES = {}
+# Cada tabela custa cerca de 5 exponenciações; abaixo desta quantidade de blocos não compensa
+FIXED_BASE_MIN_BLOCKS = 8
+
+# @Brief Pré-calcula uma tabela de base fixa: linha i, coluna j = base^(j * 2^(window * i)) mod mod
+# @Arg1 -> Base fixa
+# @Arg2 -> Valor do módulo
+# @Arg3 -> Tamanho, em bits, do maior expoente utilizado
+# @Arg4 -> Tamanho da janela, em bits
+# @Return -> Tabela (lista de linhas)
+def fixedBaseTable(base, mod, bits, window = FIXED_BASE_WINDOW):
+    table = []
+    for i in xrange(0, (bits + window - 1) // window):
+        row = [1]
+        for j in xrange(1, 1 << window):
+            row.append(row[-1] * base % mod)
+        table.append(row)
+        base = row[-1] * base % mod
+    return table
+
+# @Brief Obtém (e guarda) a tabela de base fixa para expoentes menores que o módulo
+# @Arg1 -> Base fixa
+# @Arg2 -> Valor do módulo
+# @Return -> Tabela gerada por fixedBaseTable
+def getFixedBaseTable(base, mod):
+    key = (base, mod)
+    if key not in FIXED_BASE_TABLES:
+        if len(FIXED_BASE_TABLES) >= FIXED_BASE_CACHE_SIZE:
+            FIXED_BASE_TABLES.clear()
+        FIXED_BASE_TABLES[key] = fixedBaseTable(base, mod, mod.bit_length())
+    return FIXED_BASE_TABLES[key]
+
+# @Brief Exponenciação modular que usa a tabela de base fixa, se já tiver sido calculada
+# (com um backend nativo, usa sempre a exponenciação do backend)
+# @Arg1 -> Base
+# @Arg2 -> Expoente (menor que o módulo)
+# @Arg3 -> Valor do módulo
+# @Return -> Resultado da exponenciação modular
+def cachedBaseExpMod(base, exp, mod):
+    table = FIXED_BASE_TABLES.get((base, mod))
+    if table is None or ARITHMETIC_BACKEND in NATIVE_BACKENDS:
+        return expMod(base, exp, mod)
+    return fixedBaseExpMod(table, exp, mod)
+
+# @Brief Exponenciação modular com base fixa (uma multiplicação por janela do expoente)
+# @Arg1 -> Tabela gerada por fixedBaseTable
+# @Arg2 -> Expoente (menor que 2^bits da tabela)
+# @Arg3 -> Valor do módulo
+# @Arg4 -> Tamanho da janela, em bits
+# @Return -> Resultado da exponenciação modular
+def fixedBaseExpMod(table, exp, mod, window = FIXED_BASE_WINDOW):
+    mask = (1 << window) - 1
+    rest = 1
+    for row in table:
+        if not exp:
+            break
+        if exp & mask:
+            rest = rest * row[exp & mask] % mod
+        exp >>= window
+    assert(exp == 0)
+    return rest
+
+# @Brief Exponenciação modular com janela deslizante (da esquerda para a direita)
+# @Arg1 -> Base a ser testada
+# @Arg2 -> Expoente da base
+# @Arg3 -> Valor do módulo
+# @Arg4 -> Tamanho máximo da janela, em bits
+# @Return -> Resultado da exponenciação modular
+def expModSlidingWindow(base, exp, mod, window = 5):
+    base = base % mod
+    # Potências ímpares da base: base^1, base^3, ..., base^(2^window - 1)
+    square = base * base % mod
+    odd = [base]
+    for i in xrange(1, 1 << (window - 1)):
+        odd.append(odd[-1] * square % mod)
+    rest = 1 % mod
+    i = exp.bit_length() - 1
+    while i >= 0:
+        if not (exp >> i) & 1:
+            rest = rest * rest % mod
+            i -= 1
+            continue
+        # Maior janela (até window bits) que começa em i e termina em um bit 1
+        l = max(i - window + 1, 0)
+        while not (exp >> l) & 1:
+            l += 1
+        for j in xrange(0, i - l + 1):
+            rest = rest * rest % mod
+        rest = rest * odd[((exp >> l) & ((1 << (i - l + 1)) - 1)) >> 1] % mod
+        i = l - 1
+    return rest
+
+# Tamanho da janela (em bits) da multi-exponenciação
+MULTI_EXP_WINDOW = 4
+
+# @Brief Multi-exponenciação simultânea (Straus/Shamir): Π bases[i]^exps[i] mod mod
+# Todas as potências compartilham a mesma sequência de quadrados; cada base
+# contribui apenas com uma multiplicação por janela do seu expoente.
+# @Arg1 -> Bases
+# @Arg2 -> Expoentes (não negativos)
+# @Arg3 -> Valor do módulo
+# @Arg4 -> Tamanho da janela, em bits
+# @Return -> Produto das exponenciações módulo mod
+def multiExpMod(bases, exps, mod, window = MULTI_EXP_WINDOW):
+    if ARITHMETIC_BACKEND in NATIVE_BACKENDS:
+        # Uma exponenciação nativa por base é mais rápida que o laço em Python
+        rest = 1 % mod
+        for base, exp in zip(bases, exps):
+            rest = rest * expMod(base, exp, mod) % mod
+        return rest
+    tables = []
+    for base in bases:
+        row = [1, base % mod]
+        for j in xrange(2, 1 << window):
+            row.append(row[-1] * row[1] % mod)
+        tables.append(row)
+    mask = (1 << window) - 1
+    top = (max(exp.bit_length() for exp in exps) + window - 1) // window * window
+    rest = 1 % mod
+    for shift in xrange(top - window, -1, -window):
+        if rest != 1:
+            for i in xrange(0, window):
+                rest = rest * rest % mod
+        for row, exp in zip(tables, exps):
+            digit = (exp >> shift) & mask
+            if digit:
+                rest = rest * row[digit] % mod
+    return rest
+
+# @Brief MDC (algoritmo de Euclides, iterativo)
 # @Arg1 -> Dividendo
 # @Arg2 -> Divisor
 # @Return -> MDC(dividendo, divisor)
-def mdc(a, b):
-    if b == 0:
-        return a
-    else:
-        return mdc(b, a % b)
+def mdcEuclid(a, b):
+    while b != 0:
+        a, b = b, a % b
+    return a
+
+# @Brief Símbolo de Jacobi (a/n), sem exponenciação modular (igual ao de Legendre para n primo)
+# @Arg1 -> Inteiro
+# @Arg2 -> Inteiro ímpar positivo
+# @Return -> 1, -1 ou 0
+def jacobiSymbol(a, n):
+    a %= n
+    result = 1
+    while a:
+        while a % 2 == 0:
+            a //= 2
+            if n % 8 in (3, 5):
+                result = -result
+        a, n = n, a
+        if a % 4 == 3 and n % 4 == 3:
+            result = -result
+        a %= n
+    return result if n == 1 else 0
 
 # @Brief Teste de Miller Rabin
 # @Arg1 -> Número a ser testado.
@@ -75,20 +251,70 @@ def millerRabinMultiTest(n, bases = 30):
             return False
     return True
 
+# Primos pequenos utilizados no crivo, tamanho da janela (em candidatos ímpares)
+# e limites do tamanho, em bits, dos primos gerados
+SIEVE_LIMIT = 8192
+SIEVE_WINDOW = 4096
+MIN_PRIME_BITS = 16
+MAX_PRIME_BITS = 4096
+
+# @Brief Crivo de Eratóstenes
+# @Arg1 -> Limite superior (exclusivo)
+# @Return -> Lista dos primos ímpares menores que o limite
+def getSmallPrimes(limit):
+    isPrime = bytearray([1]) * limit
+    isPrime[0] = isPrime[1] = 0
+    for i in xrange(2, int(limit ** 0.5) + 1):
+        if isPrime[i]:
+            isPrime[i*i::i] = bytearray(len(xrange(i*i, limit, i)))
+    return [i for i in xrange(3, limit) if isPrime[i]]
+
+SMALL_PRIMES = getSmallPrimes(SIEVE_LIMIT)
+
+# @Brief Crivo de uma janela de candidatos ímpares consecutivos
+# A posição j representa start + 2j; a partir do resto de start por cada primo
+# pequeno, marca diretamente todas as posições divisíveis por ele.
+# @Arg1 -> Primeiro candidato (ímpar e maior que SIEVE_LIMIT)
+# @Arg2 -> Quantidade de candidatos na janela
+# @Arg3 -> Se True, também elimina os candidatos q com 2q + 1 composto (primos seguros)
+# @Return -> bytearray com 1 nas posições que sobreviveram ao crivo
+def sieveWindow(start, size = SIEVE_WINDOW, safe = False):
+    sieve = bytearray([1]) * size
+    for p in SMALL_PRIMES:
+        # (p + 1) / 2 é o inverso de 2 módulo p
+        inverse2 = (p + 1) // 2
+        rest = start % p
+        # Menor j com start + 2j ≡ 0 (mod p)
+        j = (p - rest) * inverse2 % p
+        sieve[j::p] = bytearray(len(xrange(j, size, p)))
+        if safe:
+            # 2q + 1 ≡ 0 (mod p) equivale a q ≡ (p - 1) / 2 (mod p)
+            j = ((p - 1) // 2 - rest) * inverse2 % p
+            sieve[j::p] = bytearray(len(xrange(j, size, p)))
+    return sieve
+
 # @Brief Retorna um número possívelmente primo
+# Parte de um ímpar aleatório com o bit mais significativo ligado e percorre
+# a janela crivada, aplicando Miller Rabin apenas aos sobreviventes.
 # @Arg1 -> Tamanho, em bits, do primo a ser gerado (padrão = 128)
 # @Return -> Um possível número primo de tamanho igual ao seu argumento
 def generatePossiblePrime(bits = 128):
-    possiblePrimeNumber = getrandbits(bits) 
-    while not millerRabinMultiTest(possiblePrimeNumber):
-        possiblePrimeNumber = getrandbits(bits)
-    return possiblePrimeNumber
+    assert(MIN_PRIME_BITS <= bits <= MAX_PRIME_BITS)
+    while True:
+        start = getrandbits(bits) | (1 << (bits - 1)) | 1
+        sieve = sieveWindow(start)
+        for j in xrange(0, SIEVE_WINDOW):
+            candidate = start + 2*j
+            if candidate >> bits:
+                break
+            if sieve[j] and millerRabinMultiTest(candidate):
+                return candidate
 
-# @Brief Obtém o inverso de b módulo n
+# @Brief Obtém o inverso de b módulo n (algoritmo de Euclides estendido)
 # @Arg1 -> Primo
 # @Arg2 -> Primo
 # @Return -> Inverso de b módulo n
-def getInverse(b, n):
+def getInverseEuclid(b, n):
     x0, x1, y0, y1 = 1, 0, 0, 1
     while n != 0:
         q, b, n = b // n, n, b % n
@@ -97,6 +323,60 @@ def getInverse(b, n):
     assert(b == 1)
     return x0
 
+# @Brief Obtém o inverso de b módulo n utilizando o gmpy2
+# @Arg1 -> Primo
+# @Arg2 -> Primo
+# @Return -> Inverso de b módulo n
+def getInverseGmpy2(b, n):
+    return int(gmpy2.invert(b, n))
+
+# Backends de aritmética modular: (exponenciação, inverso, mdc)
+ARITHMETIC_BACKENDS = {
+    "binary": (expModBinary, getInverseEuclid, mdcEuclid),
+    "window": (expModSlidingWindow, getInverseEuclid, mdcEuclid),
+    "builtin": (pow, getInverseEuclid, gcd),
+}
+if gmpy2 is not None:
+    ARITHMETIC_BACKENDS["gmpy2"] = (lambda base, exp, mod: int(gmpy2.powmod(base, exp, mod)),
+                                    getInverseGmpy2, lambda a, b: int(gmpy2.gcd(a, b)))
+
+# Backends em código nativo: neles, a exponenciação do backend é mais rápida que as
+# tabelas de base fixa e a multi-exponenciação escritas em Python
+NATIVE_BACKENDS = ("gmpy2",)
+
+# @Brief Seleciona o backend utilizado por expMod, getInverse e mdc
+# @Arg1 -> Nome do backend (chave de ARITHMETIC_BACKENDS)
+def setArithmeticBackend(name):
+    global expMod, getInverse, mdc, ARITHMETIC_BACKEND
+    expMod, getInverse, mdc = ARITHMETIC_BACKENDS[name]
+    ARITHMETIC_BACKEND = name
+
+# Padrão: gmpy2 quando instalado; senão, o pow nativo de três argumentos
+setArithmeticBackend("gmpy2" if gmpy2 is not None else "builtin")
+
+# @Brief Verifica se todos os backends produzem os mesmos resultados
+# @Arg1 -> Quantidade de testes por tamanho de número
+# @Return -> True ou False
+def arithmeticSelfTest(rounds = 20):
+    ok = True
+    for bits in (8, 64, 256, 1024):
+        for i in range(0, rounds):
+            mod = getrandbits(bits) | (1 << (bits - 1)) | 1
+            base, exp = getrandbits(bits + 8), getrandbits(bits)
+            a, b = getrandbits(bits) | 1, getrandbits(bits) | 1
+            expected = None
+            for name in sorted(ARITHMETIC_BACKENDS):
+                expModBackend, getInverseBackend, mdcBackend = ARITHMETIC_BACKENDS[name]
+                result = (expModBackend(base, exp, mod), mdcBackend(a, b))
+                if result[1] == 1:
+                    result += (getInverseBackend(a, b) % b,)
+                if expected is None:
+                    expected = result
+                elif result != expected:
+                    print "Backend %s divergente: base=%d exp=%d mod=%d a=%d b=%d" % (name, base, exp, mod, a, b)
+                    ok = False
+    return ok
+
 # @Brief Verifica se b tem inverso módulo n
 # @Arg1 -> Primo
 # @Arg2 -> Primo
@@ -111,49 +391,120 @@ def hasInverse(b, n):
         return True
     return False
 
+# Tamanho dos buffers de leitura e escrita dos arquivos processados
+IO_BUFFER_SIZE = 1 << 20
+
+# Abre os arquivos processados (com --metrics, é substituída por MeteredFile, que conta os bytes)
+openDataFile = open
+
 # @Brief Realiza uma leitura fragmentada e sob demanda de uma arquivo
 # @Arg1 -> Delimitador para leitura fragmentada
 # @Arg2 -> Tamanho do buffer
 # @Return -> Fragmento do texto lido
-def fileSplit(f, delimeter = '-', bufsize = 1024):
-    frag = ''
+def fileSplit(f, delimeter = '-', bufsize = IO_BUFFER_SIZE):
+    # Os pedaços de um token longo são acumulados em lista (concatenação linear)
+    frag = []
     while True:
         s = f.read(bufsize)
         if not s:
             break
         split = s.split(delimeter)
         if len(split) > 1:
-            yield frag + split[0]
-            frag = split[-1]
+            frag.append(split[0])
+            yield "".join(frag)
+            frag = [split[-1]]
             for x in split[1:-1]:
                 yield x
         else:
-            frag += s
+            frag.append(s)
+    frag = "".join(frag)
     if frag:
         yield frag
 
+# @Brief Escreve uma sequência de pedaços agrupando-os em escritas grandes
+# @Arg1 -> Arquivo aberto para escrita
+# @Arg2 -> Pedaços (bytes)
+# @Arg3 -> Quantidade de bytes acumulados antes de cada escrita
+def writeBuffered(f, pieces, bufsize = IO_BUFFER_SIZE):
+    buffer, length = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        length += len(piece)
+        if length >= bufsize:
+            f.write("".join(buffer))
+            buffer, length = [], 0
+    if buffer:
+        f.write("".join(buffer))
+
+# @Brief Quantidade de bytes de texto claro que cabem em um bloco menor que o módulo
+# @Arg1 -> Módulo (n do RSA)
+# @Return -> Tamanho do bloco, em bytes
+def getBlockSize(mod):
+    size = (mod.bit_length() - 1) // 8
+    assert(size >= 1)
+    return size
+
+# @Brief Converte uma sequência de bytes (big-endian) em inteiro
+# @Arg1 -> Bytes a serem convertidos
+# @Return -> Inteiro correspondente
+def bytesToInt(data):
+    return int(hexlify(data), 16)
+
+# @Brief Converte um inteiro em uma sequência de bytes (big-endian) de tamanho fixo
+# @Arg1 -> Inteiro a ser convertido
+# @Arg2 -> Tamanho, em bytes, da saída
+# @Return -> Bytes correspondentes
+def intToBytes(value, size):
+    return unhexlify('%0*x' % (2 * size, value))
+
+# @Brief Converte um valor decriptado em um bloco de tamanho fixo
+# Um valor maior que o bloco só aparece quando a chave não é a usada na encriptação.
+# @Arg1 -> Valor decriptado
+# @Arg2 -> Tamanho, em bytes, do bloco
+# @Return -> Bytes do bloco
+def blockToBytes(value, size):
+    if value >> (8 * size):
+        raise ValueError("valor decriptado maior que o bloco: chave incorreta")
+    return intToBytes(value, size)
+
+# @Brief Completa o último bloco (ISO/IEC 7816-4: byte 0x80 seguido de zeros)
+# @Arg1 -> Último fragmento lido (menor que o bloco)
+# @Arg2 -> Tamanho do bloco
+# @Return -> Bloco completo
+def padBlock(data, size):
+    data += '\x80'
+    return data + '\x00' * (-len(data) % size)
+
+# @Brief Remove o preenchimento inserido por padBlock
+# @Arg1 -> Último bloco decriptado
+# @Return -> Bytes originais do bloco
+def unpadBlock(data):
+    data = data.rstrip('\x00')
+    assert(data.endswith('\x80'))
+    return data[:-1]
+
+# @Brief Lê um arquivo em blocos de tamanho fixo, preenchendo o último
+# @Arg1 -> Arquivo aberto para leitura
+# @Arg2 -> Tamanho do bloco
+# @Return -> Blocos (todos com o mesmo tamanho)
+def readBlocks(f, size):
+    bufsize = max(IO_BUFFER_SIZE // size, 1) * size
+    chunk = f.read(bufsize)
+    while len(chunk) == bufsize:
+        for i in xrange(0, bufsize, size):
+            yield chunk[i:i+size]
+        chunk = f.read(bufsize)
+    full = len(chunk) - len(chunk) % size
+    for i in xrange(0, full, size):
+        yield chunk[i:i+size]
+    yield padBlock(chunk[full:], size)
+
+# @Brief Converte um inteiro não negativo para hexadecimal (maiúsculo), em tempo linear
+# @Arg1 -> Inteiro
+# @Return -> Texto em hexadecimal
 def convertToHex(decimal):
-    n = (decimal % 16)
-    temp = ""
-    if (n < 10):
-        temp = n
-    if (n == 10):
-        temp = "A"
-    if (n == 11):
-        temp = "B"
-    if (n == 12):
-        temp = "C"
-    if (n == 13):
-        temp = "D"
-    if (n == 14):
-        temp = "E"
-    if (n == 15):
-        temp = "F"
-    if (decimal - n != 0):
-        return convertToHex(decimal / 16) + str(temp)
-    else:
-        return str(temp)
-    
+    return "%X" % decimal
+
 def convertToDec(hexadecimal):
 	n = hexadecimal
 	result = int(n,16)
@@ -166,6 +517,27 @@ def readAllFile(path):
     with open(path, 'rb') as f:
         return f.read()
     
+# Tamanho do buffer utilizado no cálculo do hash de arquivos (0 = arquivo mapeado em memória)
+HASH_BUFFER_SIZE = 1 << 20
+
+# @Brief Calcula o sha224 de um arquivo com uso de memória constante
+# @Arg1 -> Nome/Caminho do arquivo
+# @Arg2 -> Tamanho do buffer de leitura (0 = mapeia o arquivo em memória com mmap)
+# @Return -> Hash do arquivo (int)
+def hashFile(path, bufsize = HASH_BUFFER_SIZE):
+    h = sha224()
+    with openDataFile(path, 'rb') as f:
+        if bufsize == 0 and os.fstat(f.fileno()).st_size > 0:
+            mapped = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+            try:
+                h.update(mapped)
+            finally:
+                mapped.close()
+        else:
+            for chunk in iter(lambda: f.read(bufsize or HASH_BUFFER_SIZE), ''):
+                h.update(chunk)
+    return int(h.hexdigest(), 16)
+
 # @Brief Verifica se um arquivo existe
 # @Arg1 -> Nome/Caminho do arquivo
 # @Return -> True ou False
@@ -187,15 +559,161 @@ def makeQuestion(message):
 def changeNameExtensionsToDotKryptos(path):
     return path.rpartition('.')[0] + ".txt"
 
+# Linha de um arquivo de chaves: "nome - HEX", "nome = HEX" ou apenas "HEX"
+KEY_FILE_LINE = re.compile(r'^\s*(?:\w+\s*[-=]\s*)?([0-9A-Fa-f]+)\s*$', re.M)
+
+# @Brief Lê os valores (em hexadecimal) de um arquivo de chaves ou de assinatura
+# @Arg1 -> Nome/Caminho do arquivo
+# @Return -> Lista de inteiros, na ordem do arquivo
 def getKeysFromFile(path):
-    content = readAllFile(path)
-    values = []
-    for i in re.findall(r'\w*[0-9A-F]', content):
-        values.append(int(convertToDec(i)))
-    print values
-    return values
-    
-    
+    return [int(value, 16) for value in KEY_FILE_LINE.findall(readAllFile(path))]
+
+# ======================================== Formato binário ========================================  #
+
+# Cabeçalho: assinatura, versão, algoritmo, largura de cada inteiro cifrado,
+# tamanho do bloco de texto claro e identificador (fingerprint) da chave
+CONTAINER_MAGIC = "KRPT"
+CONTAINER_VERSION = 1
+CONTAINER_HEADER = struct.Struct(">4sBBHH8s")
+ALGORITHM_RSA = 1
+ALGORITHM_ELGAMAL = 2
+ALGORITHM_HYBRID_RSA = 3
+ALGORITHM_HYBRID_ELGAMAL = 4
+ALGORITHM_CHUNKED_RSA = 5
+ALGORITHM_CHUNKED_ELGAMAL = 6
+ALGORITHM_SIGNED_RSA = 7
+ALGORITHM_SIGNED_ELGAMAL = 8
+ALGORITHM_INCREMENTAL_RSA = 9
+ALGORITHM_INCREMENTAL_ELGAMAL = 10
+ELGAMAL_ALGORITHMS = (ALGORITHM_ELGAMAL, ALGORITHM_HYBRID_ELGAMAL, ALGORITHM_CHUNKED_ELGAMAL,
+                      ALGORITHM_SIGNED_ELGAMAL, ALGORITHM_INCREMENTAL_ELGAMAL)
+
+# Quantidade de registros lidos do disco por vez
+CONTAINER_RECORDS_PER_READ = 4096
+
+# @Brief Largura, em bytes, de um inteiro menor que o módulo
+# @Arg1 -> Módulo (n do RSA ou p do El Gamal)
+# @Return -> Quantidade de bytes
+def getCipherWidth(mod):
+    return (mod.bit_length() + 7) // 8
+
+# @Brief Identificador da chave pública (conhecida pelas duas partes)
+# No RSA, o módulo n já identifica a chave; no El Gamal, chaves do mesmo grupo compartilham p,
+# então o identificador inclui também c.
+# @Arg1 -> Módulo (n do RSA ou p do El Gamal)
+# @Arg2 -> Chave pública c do El Gamal (None no RSA)
+# @Return -> 8 bytes do sha224 do módulo (e de c)
+def keyFingerprint(mod, c = None):
+    width = getCipherWidth(mod)
+    data = intToBytes(mod, width) if c is None else intToBytes(mod, width) + intToBytes(c, width)
+    return sha224(data).digest()[:8]
+
+# @Brief Escreve o cabeçalho do contêiner binário
+# @Arg1 -> Arquivo aberto para escrita binária
+# @Arg2 -> Algoritmo (ALGORITHM_RSA ou ALGORITHM_ELGAMAL)
+# @Arg3 -> Módulo da chave
+# @Arg4 -> Tamanho do bloco de texto claro
+# @Arg5 -> Chave pública c do El Gamal (None no RSA)
+def writeContainerHeader(f, algorithm, mod, size, c = None):
+    f.write(CONTAINER_HEADER.pack(CONTAINER_MAGIC, CONTAINER_VERSION, algorithm,
+                                  getCipherWidth(mod), size, keyFingerprint(mod, c)))
+
+# @Brief Lê o cabeçalho do contêiner binário, se existir
+# @Arg1 -> Arquivo aberto para leitura binária
+# @Return -> (algoritmo, largura, tamanho do bloco, fingerprint) ou None para o formato texto
+def readContainerHeader(f):
+    data = f.read(CONTAINER_HEADER.size)
+    if len(data) == CONTAINER_HEADER.size and data.startswith(CONTAINER_MAGIC):
+        magic, version, algorithm, width, size, fingerprint = CONTAINER_HEADER.unpack(data)
+        assert(version == CONTAINER_VERSION)
+        return algorithm, width, size, fingerprint
+    f.seek(0)
+    return None
+
+# @Brief Verifica se o cabeçalho corresponde ao algoritmo e à chave informados
+# @Arg1 -> Cabeçalho retornado por readContainerHeader
+# @Arg2 -> Algoritmo esperado
+# @Arg3 -> Módulo da chave
+# @Arg4 -> Chave pública c do El Gamal (None no RSA ou quando as chaves foram digitadas sem ela)
+# @Return -> True ou False
+def checkContainerHeader(header, algorithm, mod, c = None):
+    if header[0] != algorithm or header[1] != getCipherWidth(mod):
+        return False
+    if algorithm in ELGAMAL_ALGORITHMS:
+        # Sem c não há como conferir o identificador; contêineres antigos identificam apenas p
+        return c is None or header[3] in (keyFingerprint(mod, c), keyFingerprint(mod))
+    return header[3] == keyFingerprint(mod)
+
+# @Brief Codifica um registro (um ou mais inteiros de largura fixa)
+# @Arg1 -> Inteiros do registro
+# @Arg2 -> Largura de cada inteiro
+# @Return -> Bytes do registro
+def packContainerRecord(values, width):
+    return "".join(intToBytes(v, width) for v in values)
+
+# @Brief Escreve um registro (um ou mais inteiros de largura fixa)
+# @Arg1 -> Arquivo aberto para escrita binária
+# @Arg2 -> Inteiros do registro
+# @Arg3 -> Largura de cada inteiro
+def writeContainerRecord(f, values, width):
+    f.write(packContainerRecord(values, width))
+
+# @Brief Escreve vários registros, agrupados em escritas grandes
+# @Arg1 -> Arquivo aberto para escrita binária
+# @Arg2 -> Registros (cada um uma sequência de inteiros)
+# @Arg3 -> Largura de cada inteiro
+def writeContainerRecords(f, records, width):
+    writeBuffered(f, (packContainerRecord(values, width) for values in records))
+
+# @Brief Lê exatamente um registro do contêiner
+# @Arg1 -> Arquivo posicionado no registro
+# @Arg2 -> Largura de cada inteiro
+# @Arg3 -> Quantidade de inteiros no registro
+# @Return -> Lista de inteiros do registro
+def readContainerRecord(f, width, components = 1):
+    data = f.read(width * components)
+    assert(len(data) == width * components)
+    return [bytesToInt(data[j:j+width]) for j in xrange(0, len(data), width)]
+
+# @Brief Lê os registros do contêiner em grandes fatias
+# @Arg1 -> Arquivo posicionado após o cabeçalho
+# @Arg2 -> Largura de cada inteiro
+# @Arg3 -> Quantidade de inteiros por registro (1 no RSA, 2 no El Gamal)
+# @Return -> Lista de inteiros de cada registro
+def readContainerRecords(f, width, components = 1):
+    recordSize = width * components
+    while True:
+        data = f.read(recordSize * CONTAINER_RECORDS_PER_READ)
+        if not data:
+            break
+        assert(len(data) % recordSize == 0)
+        for i in xrange(0, len(data), recordSize):
+            yield [bytesToInt(data[j:j+width]) for j in xrange(i, i + recordSize, width)]
+
+# @Brief Repassa os blocos decriptados, removendo o preenchimento do último
+# @Arg1 -> Blocos decriptados (bytes)
+# @Return -> Blocos sem o preenchimento
+def unpaddedBlocks(blocks):
+    previous = None
+    for block in blocks:
+        if previous is not None:
+            yield previous
+        previous = block
+    if previous is not None:
+        yield unpadBlock(previous)
+
+# @Brief Escreve os blocos decriptados, removendo o preenchimento do último
+# @Arg1 -> Arquivo aberto para escrita binária
+# @Arg2 -> Blocos decriptados (bytes)
+def writeUnpaddedBlocks(f, blocks):
+    writeBuffered(f, unpaddedBlocks(blocks))
+
+# @Brief Leitor de compatibilidade para o formato texto ("c-" no RSA, "s|t-" no El Gamal)
+# @Arg1 -> Arquivo aberto para leitura
+# @Return -> Lista de inteiros de cada token
+def readTextRecords(f):
+    for token in fileSplit(f):
+        yield [int(i) for i in token.split("|")]
 
 
 # ============================================= RSA =============================================  #
@@ -227,6 +745,25 @@ def keysRSA(p, q):
     d = getKeyD(e, fiN)
     return n, e, d
 
+# @Brief Calcula os parâmetros do Teorema Chinês do Resto para a chave privada do RSA
+# @Arg1 -> Primo p
+# @Arg2 -> Primo q
+# @Arg3 -> Chave privada (d)
+# @Return -> Parâmetros (p, q, dP, dQ, qInv)
+def keysRSACRT(p, q, d):
+    dP = d % (p-1)
+    dQ = d % (q-1)
+    qInv = getInverse(q, p) % p
+    return p, q, dP, dQ, qInv
+
+# @Brief Gera um par de chaves RSA completo, incluindo os parâmetros do Teorema Chinês do Resto
+# @Arg1 -> Tamanho, em bits, dos primos p e q
+# @Return -> (n, e, d, p, q, dP, dQ, qInv)
+def generateKeysRSA(bits = 128):
+    p, q = generatePossiblePrime(bits), generatePossiblePrime(bits)
+    n, e, d = keysRSA(p, q)
+    return (n, e, d) + keysRSACRT(p, q, d)
+
 # @Brief Encripta um bloco de bytes utilizando o RSA
 # @Arg1 -> Bloco, em bytes, a ser encriptado (char)
 # @Arg2 -> Primeiro componente da chave pública (n)
@@ -243,30 +780,174 @@ def encryptionRSA(toEncrypt, n, e):
 def decryptionRSA(toDecrypt, n, d):
     return expMod(toDecrypt, d, n)
 
+# @Brief Decripta um bloco utilizando o RSA com o Teorema Chinês do Resto (Garner)
+# @Arg1 -> Valor a ser decriptado (int)
+# @Arg2 -> Parâmetros (p, q, dP, dQ, qInv) gerados por keysRSACRT
+# @Return -> Retorna o valor decriptado
+def decryptionRSACRT(toDecrypt, crt):
+    p, q, dP, dQ, qInv = crt
+    m1 = expMod(toDecrypt % p, dP, p)
+    m2 = expMod(toDecrypt % q, dQ, q)
+    h = qInv * (m1 - m2) % p
+    return m2 + h * q
+
+# Quantidade de tokens do formato antigo processados por escrita
+LEGACY_BATCH_SIZE = 65536
+
+# @Brief Monta o dicionário reverso do formato antigo do RSA (um byte por bloco)
+# Cada byte era encriptado isoladamente e de forma determinística, então as 256
+# encriptações possíveis identificam todos os tokens do arquivo.
+# @Arg1 -> Chave pública (n)
+# @Arg2 -> Chave pública (e)
+# @Return -> Dicionário token decimal -> byte
+def legacyCodebookRSA(n, e):
+    return dict(("%d" % encryptionRSA(b, n, e), chr(b)) for b in xrange(0, 256))
+
+# @Brief Decripta o formato antigo do RSA com consultas ao dicionário reverso
+# Tokens fora do dicionário (ou todos, quando e é desconhecido) são decriptados
+# uma única vez e acrescentados a ele.
+# @Arg1 -> Tokens do arquivo encriptado
+# @Arg2 -> Arquivo aberto para escrita binária
+# @Arg3 -> Dicionário inicial (ver legacyCodebookRSA)
+# @Arg4 -> Função de decriptação
+# @Arg5 -> Argumentos extras da função de decriptação
+def decryptLegacyRSA(tokens, fileDecrypted, codebook, decrypt, decryptArgs):
+    while True:
+        batch = list(islice(tokens, LEGACY_BATCH_SIZE))
+        if not batch:
+            break
+        output = []
+        for token in batch:
+            byte = codebook.get(token)
+            if byte is None:
+                byte = codebook[token] = chr(decrypt(int(token), *decryptArgs))
+            output.append(byte)
+        fileDecrypted.write("".join(output))
+
 # ============================================ El Gamal ============================================  #
 
+# Gerador do sistema operacional (os.urandom) para os valores secretos: chave privada e k
+SECURE_RANDOM = random.SystemRandom()
+
+# Grupos MODP pré-calculados da RFC 3526 (p primo seguro, gerador 2)
+ELGAMAL_GROUPS = {
+    "modp1536": (int(
+        "FFFFFFFFFFFFFFFFC90FDAA22168C234C4C6628B80DC1CD129024E088A67CC74"
+        "020BBEA63B139B22514A08798E3404DDEF9519B3CD3A431B302B0A6DF25F1437"
+        "4FE1356D6D51C245E485B576625E7EC6F44C42E9A637ED6B0BFF5CB6F406B7ED"
+        "EE386BFB5A899FA5AE9F24117C4B1FE649286651ECE45B3DC2007CB8A163BF05"
+        "98DA48361C55D39A69163FA8FD24CF5F83655D23DCA3AD961C62F356208552BB"
+        "9ED529077096966D670C354E4ABC9804F1746C08CA237327FFFFFFFFFFFFFFFF", 16), 2),
+    "modp2048": (int(
+        "FFFFFFFFFFFFFFFFC90FDAA22168C234C4C6628B80DC1CD129024E088A67CC74"
+        "020BBEA63B139B22514A08798E3404DDEF9519B3CD3A431B302B0A6DF25F1437"
+        "4FE1356D6D51C245E485B576625E7EC6F44C42E9A637ED6B0BFF5CB6F406B7ED"
+        "EE386BFB5A899FA5AE9F24117C4B1FE649286651ECE45B3DC2007CB8A163BF05"
+        "98DA48361C55D39A69163FA8FD24CF5F83655D23DCA3AD961C62F356208552BB"
+        "9ED529077096966D670C354E4ABC9804F1746C08CA18217C32905E462E36CE3B"
+        "E39E772C180E86039B2783A2EC07A28FB5C55DF06F4C52C9DE2BCBF695581718"
+        "3995497CEA956AE515D2261898FA051015728E5A8AACAA68FFFFFFFFFFFFFFFF", 16), 2),
+    "modp3072": (int(
+        "FFFFFFFFFFFFFFFFC90FDAA22168C234C4C6628B80DC1CD129024E088A67CC74"
+        "020BBEA63B139B22514A08798E3404DDEF9519B3CD3A431B302B0A6DF25F1437"
+        "4FE1356D6D51C245E485B576625E7EC6F44C42E9A637ED6B0BFF5CB6F406B7ED"
+        "EE386BFB5A899FA5AE9F24117C4B1FE649286651ECE45B3DC2007CB8A163BF05"
+        "98DA48361C55D39A69163FA8FD24CF5F83655D23DCA3AD961C62F356208552BB"
+        "9ED529077096966D670C354E4ABC9804F1746C08CA18217C32905E462E36CE3B"
+        "E39E772C180E86039B2783A2EC07A28FB5C55DF06F4C52C9DE2BCBF695581718"
+        "3995497CEA956AE515D2261898FA051015728E5A8AAAC42DAD33170D04507A33"
+        "A85521ABDF1CBA64ECFB850458DBEF0A8AEA71575D060C7DB3970F85A6E1E4C7"
+        "ABF5AE8CDB0933D71E8C94E04A25619DCEE3D2261AD2EE6BF12FFA06D98A0864"
+        "D87602733EC86A64521F2B18177B200CBBE117577A615D6C770988C0BAD946E2"
+        "08E24FA074E5AB3143DB5BFCE0FD108E4B82D120A93AD2CAFFFFFFFFFFFFFFFF", 16), 2),
+    "modp4096": (int(
+        "FFFFFFFFFFFFFFFFC90FDAA22168C234C4C6628B80DC1CD129024E088A67CC74"
+        "020BBEA63B139B22514A08798E3404DDEF9519B3CD3A431B302B0A6DF25F1437"
+        "4FE1356D6D51C245E485B576625E7EC6F44C42E9A637ED6B0BFF5CB6F406B7ED"
+        "EE386BFB5A899FA5AE9F24117C4B1FE649286651ECE45B3DC2007CB8A163BF05"
+        "98DA48361C55D39A69163FA8FD24CF5F83655D23DCA3AD961C62F356208552BB"
+        "9ED529077096966D670C354E4ABC9804F1746C08CA18217C32905E462E36CE3B"
+        "E39E772C180E86039B2783A2EC07A28FB5C55DF06F4C52C9DE2BCBF695581718"
+        "3995497CEA956AE515D2261898FA051015728E5A8AAAC42DAD33170D04507A33"
+        "A85521ABDF1CBA64ECFB850458DBEF0A8AEA71575D060C7DB3970F85A6E1E4C7"
+        "ABF5AE8CDB0933D71E8C94E04A25619DCEE3D2261AD2EE6BF12FFA06D98A0864"
+        "D87602733EC86A64521F2B18177B200CBBE117577A615D6C770988C0BAD946E2"
+        "08E24FA074E5AB3143DB5BFCE0FD108E4B82D120A92108011A723C12A787E6D7"
+        "88719A10BDBA5B2699C327186AF4E23C1A946834B6150BDA2583E9CA2AD44CE8"
+        "DBBBC2DB04DE8EF92E8EFC141FBECAA6287C59474E6BC05D99B2964FA090C3A2"
+        "233BA186515BE7ED1F612970CEE2D7AFB81BDD762170481CD0069127D5B05AA9"
+        "93B4EA988D8FDDC186FFB7DC90A6C08F4DF435C934063199FFFFFFFFFFFFFFFF", 16), 2),
+}
+
+# @Brief Gera um primo seguro p = 2q + 1
+# q e 2q + 1 são crivados juntos; os sobreviventes passam primeiro por um teste
+# de Fermat na base 2 (barato) e só então pelo Miller Rabin completo.
+# @Arg1 -> Tamanho, em bits, de q
+# @Return -> Primos (p, q)
+def generateSafePrime(bits = 255):
+    assert(MIN_PRIME_BITS <= bits <= MAX_PRIME_BITS)
+    while True:
+        start = getrandbits(bits) | (1 << (bits - 1)) | 1
+        sieve = sieveWindow(start, SIEVE_WINDOW, True)
+        for j in xrange(0, SIEVE_WINDOW):
+            q = start + 2*j
+            if q >> bits:
+                break
+            if not sieve[j]:
+                continue
+            p = 2*q + 1
+            if expMod(2, q - 1, q) != 1 or expMod(2, p - 1, p) != 1:
+                continue
+            if millerRabinMultiTest(q) and millerRabinMultiTest(p):
+                return p, q
+
+# @Brief Gera um primo seguro utilizando vários processos
+# O primeiro processo a encontrar um primo encerra a busca dos demais.
+# @Arg1 -> Tamanho, em bits, de q
+# @Arg2 -> Quantidade de processos
+# @Return -> Primos (p, q)
+def generateSafePrimeParallel(bits = 255, jobs = 2):
+    found = Queue.Queue()
+    pool = multiprocessing.Pool(jobs, reseedWorker)
+    try:
+        results = [pool.apply_async(generateSafePrime, (bits,), callback = found.put) for i in range(0, jobs)]
+        while True:
+            try:
+                return found.get(timeout = 1)
+            except Queue.Empty:
+                # Sem o callback, uma falha no processo (ou no envio da tarefa) bloquearia a espera para sempre
+                for result in results:
+                    if result.ready() and not result.successful():
+                        result.get()
+    finally:
+        pool.terminate()
+        pool.join()
+
 # @Brief Gera um primp P e o gerador G (sem gauss) para o método El Gamal
 # @Arg1 -> tamanho do número Q que gerará P e G
+# @Arg2 -> Quantidade de processos utilizados na busca do primo
+# @Arg3 -> Nome de um grupo de ELGAMAL_GROUPS (dispensa a geração)
 # @Return -> Retorna um Primo P e um gerador G
-def generatePrimeAndGeneratorToElGamal(bits = 255):
-    q = getrandbits(bits) 
-    while True:
-        while not millerRabinMultiTest(q):
-            q = getrandbits(bits)
-        p = 2*q + 1
-        if millerRabinMultiTest(p):
-            break
-        q = getrandbits(bits)
+def generatePrimeAndGeneratorToElGamal(bits = 255, jobs = 1, group = None):
+    if group is not None:
+        return ELGAMAL_GROUPS[group]
+    if jobs > 1:
+        p, q = generateSafePrimeParallel(bits, jobs)
+    else:
+        p, q = generateSafePrime(bits)
     g = 2
     while expMod(g, q, p) == 1:
         g = g + 1
     return p, g
 
 # @Brief Gera todas as chaves necessárias para o método El Gamal
+# @Arg1 -> tamanho do número Q que gerará P e G
+# @Arg2 -> Quantidade de processos utilizados na busca do primo
+# @Arg3 -> Nome de um grupo de ELGAMAL_GROUPS (opcional)
 # @Return -> Retorna chaves para o método El Gamal
-def keysElGamal():
-    p, g = generatePrimeAndGeneratorToElGamal()
-    d = randint(2, p-2)
+def keysElGamal(bits = 255, jobs = 1, group = None):
+    p, g = generatePrimeAndGeneratorToElGamal(bits, jobs, group)
+    d = SECURE_RANDOM.randint(2, p-2)
     c = expMod(g, d, p)
     return p, g, c, d
 
@@ -277,36 +958,76 @@ def keysElGamal():
 # @Arg4 -> Chave pública (c)
 # @Return -> Retorna o bloco de bytes encriptado no formato tuple
 def encryptionElGamal(toEncrypt, p, g, c):
-    k = randint(2, 10) # Explicar isso
-    s = expMod(g, k, p)
-    t = (toEncrypt * pow(c,k)) % p
+    # k secreto, do gerador do sistema operacional; g e c usam as tabelas pré-calculadas, se houver
+    k = SECURE_RANDOM.randint(2, p-2)
+    s = cachedBaseExpMod(g, k, p)
+    t = (toEncrypt * cachedBaseExpMod(c, k, p)) % p
     return (s, t)
 
+# @Brief Calcula as tabelas de base fixa de g e c quando há blocos suficientes para compensar
+# (chamar antes do pool de processos, para que os filhos herdem as tabelas)
+# @Arg1 -> Chaves públicas (p, g, c)
+# @Arg2 -> Quantidade de blocos a encriptar
+def prepareElGamalTables(keys, blocks):
+    p, g, c = keys
+    if blocks >= FIXED_BASE_MIN_BLOCKS and ARITHMETIC_BACKEND not in NATIVE_BACKENDS:
+        getFixedBaseTable(g, p)
+        getFixedBaseTable(c, p)
+
 # @Brief Decripta um bloco de bytes utilizando o El Gamal
 # @Arg1 -> Bloco (s,t) a ser decriptado no formato tuple
 # @Arg2 -> Chave privada (p)
 # @Arg3 -> Chave privada (d)
 # @Return -> Retorna o bloco de bytes decriptado.
 def decryptionElGamal(toDecrypt, p, d): #toDecrypt = (s, t)
-    s = expMod(getInverse(toDecrypt[0], p), d , p)
+    s = getElGamalMask(toDecrypt[0], p, d)
     return s * toDecrypt[1] % p
 
+# Quantidade máxima de máscaras s^(-d) guardadas (LRU) e contadores de acertos/faltas
+ELGAMAL_MASK_CACHE_SIZE = 4096
+ELGAMAL_MASK_CACHE = OrderedDict()
+ELGAMAL_MASK_STATS = {"hits": 0, "misses": 0}
+
+# @Brief Obtém a máscara s^(-d) mod p, reaproveitando valores de s repetidos
+# Como s^(p-1) ≡ 1 (mod p), s^(-d) = s^(p-1-d): não é preciso calcular o inverso de s.
+# @Arg1 -> Componente s do bloco encriptado
+# @Arg2 -> Chave privada (p)
+# @Arg3 -> Chave privada (d)
+# @Return -> Máscara s^(-d) mod p
+def getElGamalMask(s, p, d):
+    key = (s, p, d)
+    mask = ELGAMAL_MASK_CACHE.pop(key, None)
+    if mask is None:
+        ELGAMAL_MASK_STATS["misses"] += 1
+        mask = expMod(s, p - 1 - d, p)
+        if len(ELGAMAL_MASK_CACHE) >= ELGAMAL_MASK_CACHE_SIZE:
+            ELGAMAL_MASK_CACHE.popitem(last = False)
+    else:
+        ELGAMAL_MASK_STATS["hits"] += 1
+    ELGAMAL_MASK_CACHE[key] = mask
+    return mask
+
 # =========================================== Signature ===========================================  #
 
-def signature(filename, p, g, a):
+def signature(filename, p, g, a, bufsize = HASH_BUFFER_SIZE):
+    # Pegando o hash da mensagem (leitura em blocos, sem carregar o arquivo inteiro)
+    return signatureHash(hashFile(filename, bufsize), p, g, a)
+
+# @Brief Assina o hash já calculado de uma mensagem
+# @Arg1 -> Hash da mensagem (int)
+# @Arg2 -> Chave pública (p)
+# @Arg3 -> Chave pública (g)
+# @Arg4 -> Chave privada (a)
+# @Return -> Assinatura (r, s)
+def signatureHash(h, p, g, a):
 
     #Encontrando um K que possua inverso módulo p-1
-    k = randint(2,p-2)
+    k = SECURE_RANDOM.randint(2,p-2)
     while mdc(k, p-1) != 1:
-        k = randint(2,p-2)
+        k = SECURE_RANDOM.randint(2,p-2)
 
     #Calculando o inverso de K
     ki = getInverse(k, p-1) % (p-1)
-    
-    arq = open(filename, 'rb')
-    # Pegando o hash da mensagem em formato hexadecimal...
-    content = arq.read()
-    h = int(sha224(content).hexdigest(), 16)
 
     # Calculando R
     r = expMod(g, k, p)
@@ -318,7 +1039,19 @@ def signature(filename, p, g, a):
     return (r, s)
     
 
-def checkSignature(filename, signature, p, g, v):
+def checkSignature(filename, signature, p, g, v, bufsize = HASH_BUFFER_SIZE):
+    # Pegando o hash da mensagem (leitura em blocos, sem carregar o arquivo inteiro)
+    h = hashFile(filename, bufsize)
+    return checkSignatureHash(h, signature, p, g, v)
+
+# @Brief Valida uma assinatura a partir do hash já calculado da mensagem
+# @Arg1 -> Hash da mensagem (int)
+# @Arg2 -> Assinatura (r, s)
+# @Arg3 -> Chave pública (p)
+# @Arg4 -> Chave pública (g)
+# @Arg5 -> Chave pública (v)
+# @Return -> True se a assinatura for válida
+def checkSignatureHash(h, signature, p, g, v):
 
     # Separando as variáveis R e S que estão em Signature
     r = signature[0]
@@ -327,86 +1060,1596 @@ def checkSignature(filename, signature, p, g, v):
     # Verificando se R está entre 1 e p-1
     if r < 1 or r > p-1:
         return False
-    
-    arq = open(filename, 'rb')
-    # Pegando o hash da mensagem em formato hexadecimal...
-    content = arq.read()
-    h = int(sha224(content).hexdigest(), 16)
-
-    # Calculando u1 e u2
-    # No livro o cálculo possui a seguinte forma:
-    # ( pow(v,r) * pow(r,s) ) % p
-    # Mas dessa forma o programa "voa"
-    print ("p", p)
-    print ("v", v)
-    print ("r", r)
-    print ("s", s)
-    print ("h", h)
-    u1 = (expMod(v, r, p) * expMod(r, s, p)) % p
-    u2 = expMod(g, h, p)
-
-    print ("u1", u1)
-    print ("u2", u2)
-
-    # Verificando u1 e u2 são diferentes 
-    if u1 != u2:
+
+    # No livro a verificação possui a seguinte forma:
+    # ( pow(v,r) * pow(r,s) ) % p == pow(g,h) % p
+    # Como g^(p-1) ≡ 1 (mod p), isso equivale a v^r * r^s * g^(-h mod p-1) ≡ 1,
+    # calculado em uma única passada pela multi-exponenciação
+    return multiExpMod((v, r, g), (r, s, -h % (p-1)), p) == 1
+
+# ====================================== Verificação em lote ======================================  #
+
+# Assinaturas por grupo na verificação aleatorizada e tamanho, em bits, dos expoentes aleatórios
+BATCH_VERIFY_SIZE = 64
+BATCH_VERIFY_BITS = 64
+
+# @Brief Verificação aleatorizada de várias assinaturas com a mesma chave
+# Com expoentes aleatórios e_i, testa de uma só vez
+#   v^(Σ e_i r_i) * Π r_i^(e_i s_i) ≡ g^(Σ e_i h_i) (mod p),
+# economizando as exponenciações de v e de g de cada assinatura; todas as
+# potências são calculadas em uma única multi-exponenciação.
+# O teste só é seguro no subgrupo de ordem prima q = (p-1)/2 (p primo seguro): antes, o
+# componente de ordem 2 de cada equação, v^r * r^s * g^(-h), é conferido pelos símbolos de
+# Legendre; senão, duas equações iguais a -1 se cancelariam no produto. Os e_i vêm de
+# os.urandom, para que não possam ser previstos.
+# @Arg1 -> Lista de (h, r, s)
+# @Arg2 -> Chave pública (p), primo seguro
+# @Arg3 -> Chave pública (g)
+# @Arg4 -> Chave pública (v)
+# @Return -> True se todas forem (com alta probabilidade) válidas; False se alguma for inválida
+def batchCheckSignatures(signatures, p, g, v):
+    bases, exps = [], []
+    expV, expG = 0, 0
+    symbolV, symbolG = jacobiSymbol(v, p), jacobiSymbol(g, p)
+    for h, r, s in signatures:
+        if r < 1 or r > p-1:
+            return False
+        # Símbolo de Legendre de v^r * r^s * g^(-h): como p-1 é par, só a paridade dos expoentes importa
+        symbol = (symbolV if r % 2 else 1) * (jacobiSymbol(r, p) if s % 2 else 1) * (symbolG if h % 2 else 1)
+        if symbol != 1:
+            return False
+        e = bytesToInt(os.urandom(BATCH_VERIFY_BITS // 8)) | 1
+        expV += e * r
+        expG += e * h
+        bases.append(r)
+        exps.append(e * s % (p-1))
+    bases += [v, g]
+    exps += [expV % (p-1), -expG % (p-1)]
+    return multiExpMod(bases, exps, p) == 1
+
+# @Brief Lê o manifesto da verificação em lote
+# Cada linha contém "caminho r s" (r e s em hexadecimal); linhas vazias e iniciadas por "#" são ignoradas.
+# Caminhos relativos são resolvidos a partir do diretório do manifesto.
+# @Arg1 -> Nome/Caminho do manifesto
+# @Return -> Lista de (caminho, r, s)
+def readSignatureManifest(path):
+    root = os.path.dirname(os.path.abspath(path))
+    entries = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            filename, r, s = line.rsplit(None, 2)
+            entries.append((os.path.join(root, filename), int(r, 16), int(s, 16)))
+    return entries
+
+# @Brief Verifica um grupo de entradas do manifesto (executado nos processos do pool)
+# @Arg1 -> Lista de (caminho, r, s)
+# @Arg2 -> Chave pública (p)
+# @Arg3 -> Chave pública (g)
+# @Arg4 -> Chave pública (v)
+# @Arg5 -> Tamanho do buffer do hash
+# @Arg6 -> Se True, tenta primeiro a verificação aleatorizada do grupo inteiro
+# @Return -> Lista de (caminho, válida, erro)
+def checkSignatureGroup(group, p, g, v, bufsize, randomized):
+    results, hashed = [], []
+    for filename, r, s in group:
+        try:
+            hashed.append((filename, hashFile(filename, bufsize), r, s))
+        except (IOError, OSError) as error:
+            results.append((filename, False, error.strerror))
+    if randomized and len(hashed) > 1 and batchCheckSignatures([x[1:] for x in hashed], p, g, v):
+        return results + [(filename, True, None) for filename, h, r, s in hashed]
+    for filename, h, r, s in hashed:
+        results.append((filename, checkSignatureHash(h, (r, s), p, g, v), None))
+    return results
+
+# @Brief Verifica todas as assinaturas de um manifesto com a mesma chave
+# @Arg1 -> Lista de (caminho, r, s)
+# @Arg2 -> Chave pública (p, g, v)
+# @Arg3 -> Quantidade de processos
+# @Arg4 -> Tamanho do buffer do hash
+# @Arg5 -> Se True, usa a verificação aleatorizada por grupos
+# @Return -> Resultados (caminho, válida, erro), na ordem do manifesto
+def checkSignatureManifest(entries, keys, jobs = 1, bufsize = HASH_BUFFER_SIZE, randomized = False):
+    p, g, v = keys
+    # A verificação aleatorizada exige um primo seguro; com outras chaves, cada assinatura é verificada sozinha
+    randomized = randomized and millerRabinMultiTest((p - 1) // 2)
+    size = BATCH_VERIFY_SIZE if randomized else 1
+    groups = (entries[i:i+size] for i in xrange(0, len(entries), size))
+    for results in parallelMap(checkSignatureGroup, groups, (p, g, v, bufsize, randomized), jobs):
+        for result in results:
+            yield result
+
+
+# ===================================== Assinatura em árvore ======================================  #
+
+# Tamanho dos fragmentos cujos hashes formam as folhas da árvore
+TREE_CHUNK_SIZE = 1 << 20
+# Arquivo da árvore: "KTRE", versão, tamanho do fragmento, tamanho do arquivo e quantidade de folhas,
+# seguidos dos hashes das folhas (os nós internos são recalculados a partir delas)
+TREE_MAGIC = "KTRE"
+TREE_VERSION = 1
+TREE_HEADER = struct.Struct(">4sBIQI")
+TREE_HASH_SIZE = sha224().digest_size
+# Prefixos que distinguem o hash de uma folha do hash de um nó interno
+TREE_LEAF = "\x00"
+TREE_NODE = "\x01"
+
+# @Brief Nome do arquivo da árvore de hashes de uma assinatura
+# @Arg1 -> Nome/Caminho do arquivo assinado
+# @Return -> Nome/Caminho do arquivo da árvore (no mesmo diretório do arquivo assinado)
+def signatureTreeName(filename):
+    head, tail = os.path.split(filename)
+    return os.path.join(head, "signature-" + os.path.splitext(tail)[0] + ".tree")
+
+# @Brief Quantidade de fragmentos (folhas) de um arquivo; um arquivo vazio possui uma folha vazia
+def treeChunkCount(size, chunkSize = TREE_CHUNK_SIZE):
+    return max(1, (size + chunkSize - 1) // chunkSize)
+
+# @Brief Calcula o hash de um fragmento do arquivo (executado nos processos do pool)
+# @Arg1 -> Índice do fragmento
+# @Arg2 -> Nome/Caminho do arquivo
+# @Arg3 -> Tamanho do fragmento
+# @Return -> Hash (sha224, em bytes) da folha
+def hashTreeChunk(index, path, chunkSize):
+    h = sha224(TREE_LEAF)
+    with open(path, 'rb') as f:
+        f.seek(index * chunkSize)
+        h.update(f.read(chunkSize))
+    return h.digest()
+
+# @Brief Calcula, em paralelo, os hashes dos fragmentos de um arquivo
+# @Arg1 -> Nome/Caminho do arquivo
+# @Arg2 -> Tamanho do fragmento
+# @Arg3 -> Quantidade de processos
+# @Arg4 -> Índices dos fragmentos (None = todos)
+# @Return -> Lista de hashes, na ordem dos índices
+def treeLeaves(path, chunkSize = TREE_CHUNK_SIZE, jobs = 1, indexes = None):
+    if indexes is None:
+        indexes = xrange(treeChunkCount(os.path.getsize(path), chunkSize))
+    # Um fragmento por tarefa: cada um já é grande o bastante para compensar o envio ao processo
+    return list(parallelMap(hashTreeChunk, indexes, (path, chunkSize), jobs, 1))
+
+# @Brief Calcula a raiz da árvore de Merkle (um nó sem par sobe para o nível seguinte)
+# @Arg1 -> Hashes das folhas
+# @Return -> Hash (em bytes) da raiz
+def merkleRoot(leaves):
+    level = list(leaves)
+    while len(level) > 1:
+        parents = [sha224(TREE_NODE + level[i] + level[i+1]).digest() for i in xrange(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        level = parents
+    return level[0]
+
+# @Brief Valor assinado no modo em árvore: hash da raiz junto com os parâmetros da árvore
+# @Arg1 -> Árvore (tamanho do fragmento, tamanho do arquivo, folhas)
+# @Return -> Hash (int) a ser assinado
+def treeHash(tree):
+    chunkSize, size, leaves = tree
+    header = TREE_HEADER.pack(TREE_MAGIC, TREE_VERSION, chunkSize, size, len(leaves))
+    return int(sha224(header + merkleRoot(leaves)).hexdigest(), 16)
+
+# @Brief Grava a árvore de hashes de uma assinatura
+# @Arg1 -> Nome/Caminho do arquivo da árvore
+# @Arg2 -> Árvore (tamanho do fragmento, tamanho do arquivo, folhas)
+def writeSignatureTree(path, tree):
+    chunkSize, size, leaves = tree
+    with open(path, "wb") as f:
+        f.write(TREE_HEADER.pack(TREE_MAGIC, TREE_VERSION, chunkSize, size, len(leaves)))
+        f.write("".join(leaves))
+
+# @Brief Lê a árvore de hashes de uma assinatura
+# @Arg1 -> Nome/Caminho do arquivo da árvore
+# @Return -> Árvore (tamanho do fragmento, tamanho do arquivo, folhas)
+def readSignatureTree(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < TREE_HEADER.size:
+        raise ValueError("Arquivo de árvore inválido: %s" % path)
+    magic, version, chunkSize, size, count = TREE_HEADER.unpack_from(data)
+    if magic != TREE_MAGIC or version != TREE_VERSION or len(data) != TREE_HEADER.size + count * TREE_HASH_SIZE:
+        raise ValueError("Arquivo de árvore inválido: %s" % path)
+    leaves = [data[i:i+TREE_HASH_SIZE] for i in xrange(TREE_HEADER.size, len(data), TREE_HASH_SIZE)]
+    return (chunkSize, size, leaves)
+
+# @Brief Assina um arquivo pela raiz da árvore de hashes dos seus fragmentos
+# @Arg1 -> Nome/Caminho do arquivo
+# @Arg2 -> Chave pública (p)
+# @Arg3 -> Chave pública (g)
+# @Arg4 -> Chave privada (a)
+# @Arg5 -> Quantidade de processos
+# @Arg6 -> Tamanho do fragmento
+# @Return -> (assinatura (r, s), árvore (tamanho do fragmento, tamanho do arquivo, folhas))
+def signatureTree(filename, p, g, a, jobs = 1, chunkSize = TREE_CHUNK_SIZE):
+    tree = (chunkSize, os.path.getsize(filename), treeLeaves(filename, chunkSize, jobs))
+    return signatureHash(treeHash(tree), p, g, a), tree
+
+# @Brief Valida uma assinatura em árvore e localiza os fragmentos alterados
+# A assinatura é conferida contra a raiz das folhas gravadas; depois, apenas os fragmentos
+# pedidos (ou todos) são recalculados e comparados com as folhas.
+# @Arg1 -> Nome/Caminho do arquivo
+# @Arg2 -> Assinatura (r, s)
+# @Arg3 -> Chave pública (p)
+# @Arg4 -> Chave pública (g)
+# @Arg5 -> Chave pública (v)
+# @Arg6 -> Árvore (tamanho do fragmento, tamanho do arquivo, folhas)
+# @Arg7 -> Quantidade de processos
+# @Arg8 -> Índices dos fragmentos a verificar (None = todos)
+# @Return -> (True, índices dos fragmentos alterados) ou (False, None) se a assinatura não confere com a árvore
+def checkSignatureTree(filename, signature, p, g, v, tree, jobs = 1, chunks = None):
+    if not checkSignatureHash(treeHash(tree), signature, p, g, v):
+        return False, None
+    chunkSize, size, leaves = tree
+    count = treeChunkCount(os.path.getsize(filename), chunkSize)
+    if chunks is None:
+        # Fragmentos acrescentados ou removidos também contam como alterados
+        chunks = xrange(max(count, len(leaves)))
+    chunks = sorted(set(chunks))
+    indexes = [i for i in chunks if i < count and i < len(leaves)]
+    current = dict(zip(indexes, treeLeaves(filename, chunkSize, jobs, indexes)))
+    return True, [i for i in chunks if i not in current or current[i] != leaves[i]]
+
+# @Brief Lê uma lista de fragmentos no formato "3,7-9"
+# @Return -> Lista de índices
+def parseChunkList(text):
+    chunks = []
+    for part in text.split(","):
+        start, _, end = part.partition("-")
+        chunks.extend(xrange(int(start), int(end or start) + 1))
+    return chunks
+
+# @Brief Escreve uma lista de índices no formato de parseChunkList, agrupando as sequências
+def formatChunkList(chunks):
+    parts = []
+    for i in chunks:
+        if parts and parts[-1][1] == i - 1:
+            parts[-1][1] = i
+        else:
+            parts.append([i, i])
+    return ",".join(str(a) if a == b else "%d-%d" % (a, b) for a, b in parts)
+
+
+# ========================================= Modo híbrido ==========================================  #
+
+# Tamanho das fatias lidas (múltiplo de 64) e da etiqueta HMAC
+HYBRID_CHUNK_SIZE = 1 << 20
+HYBRID_TAG_SIZE = 32
+
+# @Brief Deriva as chaves de cifragem e de autenticação a partir da chave de sessão
+# @Arg1 -> Chave de sessão (bytes)
+# @Return -> (chave da sequência cifrante, chave do HMAC)
+def getHybridKeys(sessionKey):
+    return sha256(sessionKey + "kriptos-stream").digest(), sha256(sessionKey + "kriptos-mac").digest()
+
+# @Brief Sequência cifrante em modo contador: bloco i = sha512(chave || i)
+# @Arg1 -> Chave da sequência cifrante
+# @Arg2 -> Posição inicial, em bytes (múltiplo de 64)
+# @Arg3 -> Quantidade de bytes
+# @Return -> Bytes da sequência cifrante
+def keystream(key, offset, length):
+    base = sha512(key)
+    first = offset // 64
+    blocks = []
+    for counter in xrange(first, first + (length + 63) // 64):
+        h = base.copy()
+        h.update(struct.pack(">Q", counter))
+        blocks.append(h.digest())
+    return "".join(blocks)[:length]
+
+# @Brief Ou-exclusivo de duas sequências de bytes do mesmo tamanho
+# @Arg1 -> Dados
+# @Arg2 -> Sequência cifrante
+# @Return -> Dados cifrados/decifrados
+def xorBytes(data, stream):
+    if not data:
+        return ""
+    return intToBytes(bytesToInt(data) ^ bytesToInt(stream), len(data))
+
+# @Brief Cifra um arquivo com a sequência cifrante e acrescenta a etiqueta HMAC-SHA256
+# @Arg1 -> Arquivo de entrada
+# @Arg2 -> Arquivo de saída
+# @Arg3 -> Chave de sessão
+# @Arg4 -> Hash (sha224) atualizado com o texto claro na mesma passada, opcional
+def encryptHybridStream(fileIn, fileOut, sessionKey, hasher = None):
+    streamKey, macKey = getHybridKeys(sessionKey)
+    mac = hmac.new(macKey, digestmod = sha256)
+    offset = 0
+    for chunk in iter(lambda: fileIn.read(HYBRID_CHUNK_SIZE), ""):
+        if hasher is not None:
+            hasher.update(chunk)
+        data = xorBytes(chunk, keystream(streamKey, offset, len(chunk)))
+        mac.update(data)
+        fileOut.write(data)
+        offset += len(chunk)
+    fileOut.write(mac.digest())
+
+# @Brief Decifra o restante de um arquivo híbrido e confere a etiqueta HMAC
+# Os últimos bytes (etiqueta e assinatura embutida) ficam retidos durante a leitura, então
+# o tamanho do arquivo não é necessário: funciona também com pipes, sockets e StringIO.
+# @Arg1 -> Arquivo de entrada (posicionado após a chave de sessão encriptada)
+# @Arg2 -> Arquivo de saída
+# @Arg3 -> Chave de sessão
+# @Arg4 -> Hash (sha224) atualizado com o texto claro na mesma passada, opcional
+# @Arg5 -> Quantidade de bytes após a etiqueta (assinatura embutida)
+# @Return -> True se a etiqueta conferir
+def decryptHybridStream(fileIn, fileOut, sessionKey, hasher = None, trailer = 0):
+    streamKey, macKey = getHybridKeys(sessionKey)
+    mac = hmac.new(macKey, digestmod = sha256)
+    held = HYBRID_TAG_SIZE + trailer
+    buffered = ""
+    offset = 0
+    while True:
+        read = fileIn.read(HYBRID_CHUNK_SIZE)
+        buffered += read
+        # Fragmentos de HYBRID_CHUNK_SIZE mantêm a posição alinhada aos blocos da sequência cifrante
+        while len(buffered) >= HYBRID_CHUNK_SIZE + held or (not read and len(buffered) > held):
+            size = min(HYBRID_CHUNK_SIZE, len(buffered) - held)
+            chunk, buffered = buffered[:size], buffered[size:]
+            mac.update(chunk)
+            data = xorBytes(chunk, keystream(streamKey, offset, len(chunk)))
+            if hasher is not None:
+                hasher.update(data)
+            fileOut.write(data)
+            offset += len(chunk)
+        if not read:
+            break
+    if len(buffered) < held:
         return False
+    return hmac.compare_digest(mac.digest(), buffered[:HYBRID_TAG_SIZE])
+
+# @Brief Gera uma chave de sessão aleatória do tamanho de um bloco do módulo
+# A chave ocupa o bloco inteiro: com o RSA sem preenchimento, um valor curto (m^e < n)
+# seria recuperado pela raiz e-ésima inteira do valor encriptado. As chaves da sequência
+# cifrante e do HMAC são derivadas dela por getHybridKeys.
+# @Arg1 -> Módulo (n do RSA ou p do El Gamal)
+# @Return -> Chave de sessão (bytes)
+def generateSessionKey(mod):
+    return os.urandom(getBlockSize(mod))
+
+# @Brief Encripta a chave de sessão com a chave pública
+# @Arg1 -> Método ("rsa" ou "elgamal")
+# @Arg2 -> Chaves públicas: (n, e) no RSA ou (p, g, c) no El Gamal
+# @Arg3 -> Chave de sessão
+# @Return -> Registro do contêiner com a chave de sessão encriptada
+def wrapSessionKey(method, keys, sessionKey):
+    if method == "rsa":
+        return (encryptionRSA(bytesToInt(sessionKey), *keys),)
+    return encryptionElGamal(bytesToInt(sessionKey), *keys)
+
+# @Brief Lê e decripta a chave de sessão de um contêiner híbrido
+# @Arg1 -> Método ("rsa" ou "elgamal")
+# @Arg2 -> Chaves: (n, e, d, parâmetros do TCR) no RSA ou (p, d, c) no El Gamal
+# @Arg3 -> Cabeçalho retornado por readContainerHeader
+# @Arg4 -> Arquivo posicionado após o cabeçalho
+# @Return -> Chave de sessão (ValueError se a chave não for a usada na encriptação)
+def unwrapSessionKey(method, keys, header, f):
+    if method == "rsa":
+        n, e, d, crt = keys
+        wrapped = readContainerRecord(f, header[1])[0]
+        value = decryptionRSACRT(wrapped, crt) if crt else decryptionRSA(wrapped, n, d)
+    else:
+        value = decryptionElGamal(readContainerRecord(f, header[1], 2), keys[0], keys[1])
+    return blockToBytes(value, header[2])
 
+# ==================================== Encriptação com assinatura =================================  #
+
+# Formato: o mesmo do modo híbrido, seguido da assinatura (r, s) do texto claro e,
+# nos dois últimos bytes, da largura de cada componente da assinatura
+SIGNATURE_TRAILER = struct.Struct(">H")
+
+# @Brief Escreve a assinatura embutida ao final do arquivo
+# @Arg1 -> Arquivo aberto para escrita binária
+# @Arg2 -> Assinatura (r, s)
+# @Arg3 -> Módulo (p) das chaves de assinatura
+def writeSignatureTrailer(f, signature, p):
+    width = getCipherWidth(p)
+    f.write(packContainerRecord(signature, width) + SIGNATURE_TRAILER.pack(width))
+
+# @Brief Lê a assinatura embutida sem alterar a posição atual do arquivo
+# @Arg1 -> Arquivo aberto para leitura binária
+# @Return -> (assinatura (r, s), quantidade de bytes ocupados pela assinatura) ou None
+def readSignatureTrailer(f):
+    position = f.tell()
+    f.seek(-SIGNATURE_TRAILER.size, os.SEEK_END)
+    width = SIGNATURE_TRAILER.unpack(f.read(SIGNATURE_TRAILER.size))[0]
+    trailer = 2 * width + SIGNATURE_TRAILER.size
+    if trailer > os.fstat(f.fileno()).st_size - position:
+        f.seek(position)
+        return None
+    f.seek(-trailer, os.SEEK_END)
+    signature = readContainerRecord(f, width, 2)
+    f.seek(position)
+    return signature, trailer
+
+# ==================================== Contêiner em fragmentos ====================================  #
+
+# Formato: cabeçalho, chave de sessão encriptada, fragmentos (dados + HMAC) e, ao final,
+# o índice (posição no arquivo, posição no texto claro e tamanho de cada fragmento)
+# seguido do rodapé (posição do índice, quantidade de fragmentos, HMAC do índice).
+CHUNK_SIZE = HYBRID_CHUNK_SIZE
+CHUNK_INDEX_ENTRY = struct.Struct(">QQI")
+CHUNK_FOOTER = struct.Struct(">QI32s4s")
+CHUNK_FOOTER_MAGIC = "KIDX"
+
+# @Brief HMAC de um fragmento, vinculado à sua posição (impede troca de ordem)
+# @Arg1 -> Chave do HMAC
+# @Arg2 -> Número do fragmento
+# @Arg3 -> Posição do fragmento no texto claro
+# @Arg4 -> Dados cifrados do fragmento
+# @Return -> Etiqueta (32 bytes)
+def chunkTag(macKey, number, plainOffset, data):
+    mac = hmac.new(macKey, struct.pack(">QQ", number, plainOffset), sha256)
+    mac.update(data)
+    return mac.digest()
+
+# @Brief Lê o arquivo de checkpoint de uma operação interrompida
+# @Arg1 -> Nome/Caminho do checkpoint
+# @Return -> Estado salvo ou None
+def loadCheckpoint(path):
+    if not isThisFileExists(path):
+        return None
+    return json.loads(readAllFile(path))
+
+# @Brief Salva o checkpoint de forma atômica (arquivo temporário + rename), legível só pelo dono
+# @Arg1 -> Nome/Caminho do checkpoint
+# @Arg2 -> Estado a ser salvo
+def saveCheckpoint(path, state):
+    fd = os.open(path + ".tmp", os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0600)
+    with os.fdopen(fd, "w") as f:
+        json.dump(state, f)
+    os.rename(path + ".tmp", path)
+
+# @Brief Reconstrói o índice dos fragmentos já gravados a partir do checkpoint da encriptação
+# (todos os fragmentos, exceto o último do arquivo, têm CHUNK_SIZE bytes e ficam em sequência)
+# @Arg1 -> Estado salvo por encryptChunkedStream
+# @Return -> Lista de [posição no arquivo, posição no texto claro, tamanho]
+def rebuildChunkIndex(state):
+    index = [[state["start"] + i * (CHUNK_SIZE + HYBRID_TAG_SIZE), i * CHUNK_SIZE, CHUNK_SIZE] for i in xrange(0, state["chunks"])]
+    if index:
+        assert(index[-1][:2] == state["last"][:2])
+        index[-1] = list(state["last"])
+    return index
+
+# @Brief Cifra um arquivo em fragmentos, salvando um checkpoint após cada fragmento
+# Ao retomar, o arquivo de saída é truncado no fim do último fragmento concluído.
+# O checkpoint guarda apenas a última entrada do índice; as demais são reconstruídas.
+# @Arg1 -> Arquivo de entrada
+# @Arg2 -> Arquivo de saída (aberto para leitura e escrita binária)
+# @Arg3 -> Estado: {"sessionKey": hex, "start": posição do primeiro fragmento,
+#          "chunks": fragmentos concluídos, "last": última entrada do índice ou None}
+def encryptChunkedStream(fileIn, fileOut, state):
+    checkpoint = fileOut.name + ".checkpoint"
+    streamKey, macKey = getHybridKeys(unhexlify(state["sessionKey"]))
+    index = rebuildChunkIndex(state)
+    plainOffset = index[-1][1] + index[-1][2] if index else 0
+    end = index[-1][0] + index[-1][2] + HYBRID_TAG_SIZE if index else state["start"]
+    fileIn.seek(plainOffset)
+    fileOut.seek(end)
+    fileOut.truncate()
+    fileOut.flush()
+    os.fsync(fileOut.fileno())
+    saveCheckpoint(checkpoint, state)
+    for chunk in iter(lambda: fileIn.read(CHUNK_SIZE), ""):
+        data = xorBytes(chunk, keystream(streamKey, plainOffset, len(chunk)))
+        fileOut.write(data)
+        fileOut.write(chunkTag(macKey, len(index), plainOffset, data))
+        index.append([end, plainOffset, len(chunk)])
+        end += len(data) + HYBRID_TAG_SIZE
+        plainOffset += len(chunk)
+        fileOut.flush()
+        os.fsync(fileOut.fileno())
+        state["chunks"], state["last"] = len(index), index[-1]
+        saveCheckpoint(checkpoint, state)
+    data = "".join(CHUNK_INDEX_ENTRY.pack(*entry) for entry in index)
+    fileOut.write(data)
+    fileOut.write(CHUNK_FOOTER.pack(end, len(index), hmac.new(macKey, "index" + data, sha256).digest(), CHUNK_FOOTER_MAGIC))
+    fileOut.close()
+    os.remove(checkpoint)
+
+# @Brief Retoma uma encriptação em fragmentos a partir do checkpoint
+# @Arg1 -> Nome/Caminho do arquivo de entrada
+# @Arg2 -> Nome/Caminho do arquivo encriptado (incompleto)
+def resumeChunkedEncryption(filenameToEncrypt, filenameEncrypted):
+    state = loadCheckpoint(filenameEncrypted + ".checkpoint")
+    with openDataFile(filenameToEncrypt, "rb") as fileIn, openDataFile(filenameEncrypted, "r+b") as fileOut:
+        encryptChunkedStream(fileIn, fileOut, state)
+
+# @Brief Lê e autentica o índice do contêiner em fragmentos
+# @Arg1 -> Arquivo encriptado
+# @Arg2 -> Chave do HMAC
+# @Return -> Lista de (posição no arquivo, posição no texto claro, tamanho) ou None se incompleto/adulterado
+def readChunkIndex(f, macKey):
+    size = os.fstat(f.fileno()).st_size
+    if size < CHUNK_FOOTER.size:
+        return None
+    f.seek(size - CHUNK_FOOTER.size)
+    indexOffset, count, tag, magic = CHUNK_FOOTER.unpack(f.read(CHUNK_FOOTER.size))
+    if magic != CHUNK_FOOTER_MAGIC:
+        return None
+    f.seek(indexOffset)
+    data = f.read(count * CHUNK_INDEX_ENTRY.size)
+    if not hmac.compare_digest(hmac.new(macKey, "index" + data, sha256).digest(), tag):
+        return None
+    return [CHUNK_INDEX_ENTRY.unpack_from(data, i * CHUNK_INDEX_ENTRY.size) for i in xrange(0, count)]
+
+# @Brief Lê, autentica e decifra um fragmento
+# @Arg1 -> Arquivo encriptado
+# @Arg2 -> Número do fragmento
+# @Arg3 -> Entrada do índice
+# @Arg4 -> Chave da sequência cifrante
+# @Arg5 -> Chave do HMAC
+# @Return -> Texto claro do fragmento ou None se a etiqueta não conferir
+def readChunk(f, number, entry, streamKey, macKey):
+    fileOffset, plainOffset, length = entry
+    f.seek(fileOffset)
+    data = f.read(length)
+    if not hmac.compare_digest(chunkTag(macKey, number, plainOffset, data), f.read(HYBRID_TAG_SIZE)):
+        return None
+    return xorBytes(data, keystream(streamKey, plainOffset, length))
+
+# @Brief Identifica o contêiner a que pertence o checkpoint de uma decriptação
+# @Arg1 -> Arquivo encriptado
+# @Return -> Caminho, tamanho e hash do rodapé (que autentica o índice com a chave de sessão)
+def chunkedContainerIdentity(f):
+    size = os.fstat(f.fileno()).st_size
+    f.seek(size - CHUNK_FOOTER.size)
+    return {"container": os.path.abspath(f.name), "size": size, "footer": sha256(f.read(CHUNK_FOOTER.size)).hexdigest()}
+
+# @Brief Decifra um contêiner em fragmentos (inteiro, retomável, ou apenas um intervalo de bytes)
+# @Arg1 -> Arquivo encriptado
+# @Arg2 -> Arquivo de saída (aberto para escrita binária)
+# @Arg3 -> Chave de sessão
+# @Arg4 -> Intervalo (início, fim) em bytes do texto claro, ou None para o arquivo inteiro
+# @Arg5 -> Se True, continua a partir do checkpoint de uma decriptação interrompida
+# @Return -> True se todos os fragmentos lidos forem autênticos
+def decryptChunked(fileIn, fileOut, sessionKey, byteRange = None, resume = False):
+    streamKey, macKey = getHybridKeys(sessionKey)
+    index = readChunkIndex(fileIn, macKey)
+    if index is None:
+        return False
+    if byteRange is not None:
+        start, end = byteRange
+        for number, entry in enumerate(index):
+            fileOffset, plainOffset, length = entry
+            if plainOffset + length <= start or (end is not None and plainOffset >= end):
+                continue
+            chunk = readChunk(fileIn, number, entry, streamKey, macKey)
+            if chunk is None:
+                return False
+            last = length if end is None else min(end - plainOffset, length)
+            fileOut.write(chunk[max(start - plainOffset, 0):last])
+        return True
+    checkpoint = fileOut.name + ".checkpoint"
+    identity = chunkedContainerIdentity(fileIn)
+    state = resume and loadCheckpoint(checkpoint)
+    if state and any(state.get(key) != value for key, value in identity.items()):
+        print "\nO checkpoint pertence a outro contêiner; a decriptação será refeita desde o início"
+        state = None
+    if not state:
+        state = dict(identity, chunks = 0)
+    first = state["chunks"]
+    fileOut.seek(index[first - 1][1] + index[first - 1][2] if first > 0 else 0)
+    fileOut.truncate()
+    for number in xrange(first, len(index)):
+        chunk = readChunk(fileIn, number, index[number], streamKey, macKey)
+        if chunk is None:
+            return False
+        fileOut.write(chunk)
+        fileOut.flush()
+        state["chunks"] = number + 1
+        saveCheckpoint(checkpoint, state)
+    if isThisFileExists(checkpoint):
+        os.remove(checkpoint)
     return True
 
-    
+# ===================================== Encriptação incremental ===================================  #
+
+# Formato: cabeçalho (ALGORITHM_INCREMENTAL_*) seguido, para cada fragmento definido pelo conteúdo,
+# do tamanho do fragmento e dos seus blocos encriptados (o último bloco é completado com zeros).
+# Como os cortes dependem apenas dos bytes vizinhos, uma alteração local muda só os fragmentos
+# próximos, e os demais são reaproveitados do cache sem nenhuma exponenciação.
+INCREMENTAL_CHUNK = struct.Struct(">I")
+
+# Tamanhos mínimo e máximo dos fragmentos e máscara do hash rolante (corte quando h & máscara == 0,
+# em média a cada 64 KiB após o mínimo); a máscara usa os bits altos, que dependem dos últimos 32 bytes
+CDC_MIN_SIZE = 16 << 10
+CDC_MAX_SIZE = 256 << 10
+CDC_MASK = 0xFFFF0000
+# Tabela do hash rolante (Gear), fixa para que os cortes sejam os mesmos em todas as execuções
+CDC_GEAR = [int(sha224(chr(i)).hexdigest()[:8], 16) for i in xrange(256)]
+
+# Cache dos fragmentos encriptados (um subdiretório por chave pública) e seu tamanho máximo, em bytes.
+# Quem observa duas versões encriptadas sabe quais fragmentos não mudaram; o cache fica
+# acessível apenas ao usuário, pois os nomes das entradas são hashes do texto claro.
+CHUNK_CACHE_DIR = os.environ.get("KRIPTOS_CHUNKCACHE", os.path.expanduser("~/.kriptos-chunkcache"))
+CHUNK_CACHE_LIMIT = 256 << 20
+
+# @Brief Altera o tamanho máximo do cache de fragmentos encriptados
+# @Arg1 -> Tamanho máximo, em bytes
+def setChunkCacheLimit(limit):
+    global CHUNK_CACHE_LIMIT
+    CHUNK_CACHE_LIMIT = limit
+
+# @Brief Procura o próximo corte a partir de uma posição
+# @Arg1 -> Dados lidos
+# @Arg2 -> Início do fragmento
+# @Return -> Fim do fragmento (exclusivo); o fim dos dados ou o tamanho máximo, se não houver corte
+def findChunkBoundary(data, start, minSize = CDC_MIN_SIZE, maxSize = CDC_MAX_SIZE, mask = CDC_MASK):
+    end = min(len(data), start + maxSize)
+    first = start + minSize
+    if first >= end:
+        return end
+    h = 0
+    for i, b in enumerate(bytearray(buffer(data, first, end - first))):
+        h = ((h << 1) + CDC_GEAR[b]) & 0xFFFFFFFF
+        if not h & mask:
+            return first + i + 1
+    return end
+
+# @Brief Divide um arquivo em fragmentos definidos pelo conteúdo (hash rolante)
+# @Arg1 -> Arquivo aberto para leitura binária
+# @Return -> Fragmentos (bytes), na ordem do arquivo
+def contentDefinedChunks(f, minSize = CDC_MIN_SIZE, maxSize = CDC_MAX_SIZE, mask = CDC_MASK):
+    data, start, eof = "", 0, False
+    while True:
+        if not eof and len(data) - start < maxSize:
+            block = f.read(IO_BUFFER_SIZE)
+            eof = not block
+            data = data[start:] + block
+            start = 0
+            continue
+        if start == len(data):
+            return
+        end = findChunkBoundary(data, start, minSize, maxSize, mask)
+        yield data[start:end]
+        start = end
+
+# @Brief Caminho da entrada do cache de um fragmento
+# @Arg1 -> Identificador da chave pública (n, e) ou (p, g, c)
+# @Arg2 -> Fragmento de texto claro
+# @Arg3 -> Diretório do cache
+def chunkCachePath(fingerprint, chunk, directory = CHUNK_CACHE_DIR):
+    return os.path.join(directory, hexlify(fingerprint), sha224(chunk).hexdigest())
+
+# @Brief Lê uma entrada do cache, marcando-a como usada recentemente (data de modificação)
+# @Arg1 -> Caminho da entrada
+# @Arg2 -> Tamanho esperado (entradas truncadas são ignoradas)
+# @Return -> Blocos encriptados do fragmento ou None
+def readChunkCache(path, size):
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        os.utime(path, None)
+    except (IOError, OSError):
+        return None
+    return data if len(data) == size else None
+
+# @Brief Grava uma entrada do cache (escrita atômica: arquivo temporário e rename)
+# @Arg1 -> Caminho da entrada
+# @Arg2 -> Blocos encriptados do fragmento
+def writeChunkCache(path, data):
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory, 0700)
+    temporary = "%s.%d.tmp" % (path, os.getpid())
+    with open(temporary, "wb") as f:
+        f.write(data)
+    os.rename(temporary, path)
+
+# @Brief Remove as entradas usadas há mais tempo até o cache caber no limite
+# @Arg1 -> Tamanho máximo, em bytes
+# @Arg2 -> Diretório do cache
+# @Return -> Quantidade de entradas removidas
+def trimChunkCache(limit = CHUNK_CACHE_LIMIT, directory = CHUNK_CACHE_DIR):
+    entries, total = [], 0
+    for root, dirs, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            entries.append((info.st_mtime, info.st_size, path))
+            total += info.st_size
+    evicted = 0
+    for mtime, size, path in sorted(entries):
+        if total <= limit:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        evicted += 1
+    return evicted
+
+# @Brief Encripta os blocos de um fragmento (executado nos processos do pool)
+# @Arg1 -> Fragmento de texto claro
+# @Arg2 -> Método de encriptação ("rsa" ou "elgamal")
+# @Arg3 -> Chaves públicas: (n, e) no RSA ou (p, g, c) no El Gamal
+# @Return -> Registros encriptados do fragmento (bytes)
+def encryptIncrementalChunk(chunk, encryptionMethod, keys):
+    mod = keys[0]
+    size, width = getBlockSize(mod), getCipherWidth(mod)
+    blocks = (bytesToInt(chunk[i:i+size].ljust(size, "\0")) for i in xrange(0, len(chunk), size))
+    if encryptionMethod == "rsa":
+        return "".join(intToBytes(encryptionRSA(m, *keys), width) for m in blocks)
+    return "".join(packContainerRecord(encryptionElGamal(m, *keys), width) for m in blocks)
+
+# @Brief Encripta um arquivo em fragmentos definidos pelo conteúdo, reaproveitando do cache
+# os fragmentos já encriptados com a mesma chave; apenas os novos vão para o pool.
+# @Arg1 -> Método de encriptação ("rsa" ou "elgamal")
+# @Arg2 -> Chaves públicas: (n, e) no RSA ou (p, g, c) no El Gamal
+# @Arg3 -> Arquivo de entrada
+# @Arg4 -> Arquivo de saída
+# @Arg5 -> Quantidade de processos
+# @Arg6 -> Tamanho máximo do cache, em bytes (None = CHUNK_CACHE_LIMIT)
+# @Arg7 -> Diretório do cache
+# @Return -> Estatísticas: fragmentos e bytes (totais e reaproveitados) e entradas removidas do cache
+def encryptIncremental(encryptionMethod, keys, fileIn, fileOut, jobs = 1, cacheLimit = None, directory = CHUNK_CACHE_DIR):
+    mod = keys[0]
+    size, width = getBlockSize(mod), getCipherWidth(mod)
+    record = width if encryptionMethod == "rsa" else 2 * width
+    algorithm = ALGORITHM_INCREMENTAL_RSA if encryptionMethod == "rsa" else ALGORITHM_INCREMENTAL_ELGAMAL
+    # O cache é separado pela chave pública inteira, (n, e) ou (p, g, c): chaves do mesmo
+    # grupo do El Gamal compartilham p, mas não podem compartilhar os blocos encriptados
+    fingerprint = sha224("".join(intToBytes(value, width) for value in keys)).digest()[:8]
+    chunks = contentDefinedChunks(fileIn)
+    first = list(islice(chunks, 1))
+    if encryptionMethod == "elgamal" and first:
+        prepareElGamalTables(keys, (len(first[0]) + size - 1) // size)
+    stats = {"chunks": 0, "reused": 0, "bytes": 0, "reusedBytes": 0}
+    # Fragmentos que aguardam um novo anterior a eles, na ordem do arquivo: (tamanho, caminho no cache,
+    # reaproveitado). Dos reaproveitados fica só o caminho: os dados são relidos do cache na escrita,
+    # para que uma longa sequência sem alterações não se acumule na memória.
+    pending = deque()
+
+    def write(length, data):
+        fileOut.write(INCREMENTAL_CHUNK.pack(length))
+        fileOut.write(data)
+        stats["chunks"] += 1
+        stats["bytes"] += length
+
+    def reuse(length, path, cached = None):
+        if cached is None:
+            cached = readChunkCache(path, (length + size - 1) // size * record)
+            if cached is None:
+                raise IOError("entrada removida do cache durante a encriptação: %s" % path)
+        write(length, cached)
+        stats["reused"] += 1
+        stats["reusedBytes"] += length
+
+    def misses():
+        for chunk in chain(first, chunks):
+            path = chunkCachePath(fingerprint, chunk, directory)
+            cached = readChunkCache(path, (len(chunk) + size - 1) // size * record)
+            if cached is not None and not pending:
+                # Nenhum fragmento anterior sendo encriptado: escrito imediatamente
+                reuse(len(chunk), path, cached)
+                continue
+            pending.append((len(chunk), path, cached is not None))
+            if cached is None:
+                yield chunk
+
+    writeContainerHeader(fileOut, algorithm, mod, size, keys[2] if encryptionMethod == "elgamal" else None)
+    # Cada resultado corresponde ao próximo fragmento novo da fila; os reaproveitados antes dele são escritos primeiro
+    for encrypted in chain(parallelMap(encryptIncrementalChunk, misses(), (encryptionMethod, keys), jobs, 1), [None]):
+        while pending and pending[0][2]:
+            length, path, reused = pending.popleft()
+            reuse(length, path)
+        if encrypted is not None:
+            length, path, reused = pending.popleft()
+            writeChunkCache(path, encrypted)
+            write(length, encrypted)
+    stats["evicted"] = trimChunkCache(CHUNK_CACHE_LIMIT if cacheLimit is None else cacheLimit, directory)
+    return stats
+
+# @Brief Lê os registros de um contêiner incremental
+# @Arg1 -> Arquivo posicionado após o cabeçalho
+# @Arg2 -> Cabeçalho retornado por readContainerHeader
+# @Arg3 -> Quantidade de inteiros por registro (1 no RSA, 2 no El Gamal)
+# @Arg4 -> Fila que recebe, para cada registro, quantos bytes do bloco decriptado pertencem ao arquivo
+# @Return -> Lista de inteiros de cada registro
+def readIncrementalRecords(f, header, components, lengths):
+    width, size = header[1], header[2]
+    recordSize = width * components
+    for data in iter(lambda: f.read(INCREMENTAL_CHUNK.size), ""):
+        length = INCREMENTAL_CHUNK.unpack(data)[0]
+        count = (length + size - 1) // size
+        data = f.read(count * recordSize)
+        assert(len(data) == count * recordSize)
+        for i in xrange(count):
+            lengths.append(min(size, length - i * size))
+            yield [bytesToInt(data[j:j+width]) for j in xrange(i * recordSize, (i + 1) * recordSize, width)]
+
+# ===================================== Processamento paralelo ====================================  #
+
+# Quantidade de blocos enviados a um processo por tarefa
+PARALLEL_CHUNK_SIZE = 256
+
+# @Brief Inicializa cada processo do pool com uma semente própria
+# (sem isso, os processos filhos herdariam o mesmo estado do gerador e repetiriam os mesmos sorteios)
+def reseedWorker():
+    random.seed()
+
+# @Brief Aplica uma função a todos os itens de um fragmento (executado no processo filho)
+# @Arg1 -> Tupla (função, itens, argumentos extras)
+# @Return -> Lista com os resultados, na mesma ordem dos itens
+def mapChunk(task):
+    function, chunk, args = task
+    return [function(item, *args) for item in chunk]
+
+# @Brief Divide um lote de itens em tarefas para o pool
+# @Arg1 -> Iterador de itens
+# @Arg2 -> Função a ser aplicada
+# @Arg3 -> Argumentos extras da função
+# @Arg4 -> Quantidade de processos
+# @Arg5 -> Quantidade de itens por tarefa
+# @Return -> Lista de tarefas (vazia ao final dos itens)
+def nextParallelBatch(items, function, args, jobs, chunkSize = PARALLEL_CHUNK_SIZE):
+    tasks = []
+    for i in range(0, jobs):
+        chunk = list(islice(items, chunkSize))
+        if not chunk:
+            break
+        tasks.append((function, chunk, args))
+    return tasks
+
+# @Brief Aplica function(item, *args) a cada item utilizando vários processos
+# A ordem da saída é a mesma da entrada e, no máximo, dois lotes
+# (jobs * chunkSize itens cada) ficam em memória ao mesmo tempo.
+# @Arg1 -> Função a ser aplicada (deve ser global para ser enviada aos processos)
+# @Arg2 -> Iterador de itens
+# @Arg3 -> Argumentos extras da função
+# @Arg4 -> Quantidade de processos (1 = sem paralelismo)
+# @Arg5 -> Quantidade de itens por tarefa (menor para itens custosos, como fragmentos de arquivo)
+# @Return -> Resultados, na ordem dos itens
+def parallelMap(function, items, args, jobs = 1, chunkSize = PARALLEL_CHUNK_SIZE):
+    if jobs <= 1:
+        for item in items:
+            yield function(item, *args)
+        return
+    items = iter(items)
+    pool = multiprocessing.Pool(jobs, reseedWorker)
+    try:
+        tasks = nextParallelBatch(items, function, args, jobs, chunkSize)
+        pending = pool.map_async(mapChunk, tasks) if tasks else None
+        while pending is not None:
+            results = pending.get()
+            # Submete o próximo lote antes de devolver o atual
+            tasks = nextParallelBatch(items, function, args, jobs, chunkSize)
+            pending = pool.map_async(mapChunk, tasks) if tasks else None
+            for result in results:
+                for value in result:
+                    yield value
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+# ========================================= Pool de chaves ========================================  #
+
+# Diretório do pool (um subdiretório por tipo de chave, ex.: "rsa-128", "elgamal-modp2048"),
+# quantidade máxima de chaves por tipo e quantidade abaixo da qual o pool é reabastecido
+KEY_POOL_DIR = os.environ.get("KRIPTOS_KEYPOOL", os.path.join(os.path.expanduser("~"), ".kriptos-keypool"))
+KEY_POOL_DEPTH = 16
+KEY_POOL_LOW = 4
+# Reabastecimento automático em segundo plano: desligado, a menos que seja pedido
+# (--keypool-refill ou KRIPTOS_KEYPOOL_REFILL=1); sem ele, o pool só muda com --keypool fill
+KEY_POOL_REFILL = os.environ.get("KRIPTOS_KEYPOOL_REFILL") == "1"
+
+# @Brief Liga o reabastecimento automático do pool
+def enableKeyPoolRefill():
+    global KEY_POOL_REFILL
+    KEY_POOL_REFILL = True
+
+# @Brief Nome do tipo de chave no pool
+# @Arg1 -> Algoritmo ("rsa" ou "elgamal")
+# @Arg2 -> Tamanho, em bits, dos primos
+# @Arg3 -> Grupo pré-calculado do El Gamal (opcional)
+# @Return -> Nome do tipo (subdiretório do pool)
+def keyPoolKind(algorithm, bits, group = None):
+    if algorithm == "elgamal" and group is not None:
+        return "elgamal-%s" % group
+    return "%s-%d" % (algorithm, bits)
+
+# @Brief Gera as chaves de um tipo do pool
+# @Arg1 -> Nome do tipo (ver keyPoolKind)
+# @Return -> Chaves (RSA: n, e, d, p, q, dP, dQ, qInv; El Gamal: p, g, c, d)
+def generateKeyPoolEntry(kind):
+    algorithm, param = kind.split("-", 1)
+    if algorithm == "rsa":
+        return generateKeysRSA(int(param))
+    if param in ELGAMAL_GROUPS:
+        return keysElGamal(group = param)
+    return keysElGamal(int(param))
+
+# @Brief Quantidade de chaves disponíveis de um tipo
+# @Arg1 -> Nome do tipo
+# @Return -> Profundidade do pool
+def keyPoolDepth(kind):
+    directory = os.path.join(KEY_POOL_DIR, kind)
+    if not os.path.isdir(directory):
+        return 0
+    return len([name for name in os.listdir(directory) if name.endswith(".key")])
+
+# @Brief Lê os contadores de acertos e faltas de um tipo
+# @Arg1 -> Nome do tipo
+# @Return -> Dicionário {"hits": int, "misses": int}
+def keyPoolStats(kind):
+    path = os.path.join(KEY_POOL_DIR, kind, "stats.json")
+    if not isThisFileExists(path):
+        return {"hits": 0, "misses": 0}
+    return json.loads(readAllFile(path))
+
+# @Brief Incrementa um contador ("hits" ou "misses") de um tipo
+# A leitura e a escrita ficam sob a trava "stats.lock", para que execuções simultâneas não percam contagens.
+# @Arg1 -> Nome do tipo
+# @Arg2 -> Nome do contador
+def updateKeyPoolStats(kind, counter):
+    path = os.path.join(KEY_POOL_DIR, kind, "stats.json")
+    lock = os.open(os.path.join(KEY_POOL_DIR, kind, "stats.lock"), os.O_WRONLY | os.O_CREAT, 0600)
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        stats = keyPoolStats(kind)
+        stats[counter] += 1
+        temporary = "%s.%d.tmp" % (path, os.getpid())
+        with open(temporary, "w") as f:
+            json.dump(stats, f)
+        os.rename(temporary, path)
+    finally:
+        os.close(lock)
+
+# @Brief Adiciona chaves ao pool (escrita atômica: arquivo temporário + rename)
+# @Arg1 -> Nome do tipo
+# @Arg2 -> Chaves
+def putKeysInPool(kind, keys):
+    directory = os.path.join(KEY_POOL_DIR, kind)
+    name = os.path.join(directory, "%d-%s" % (os.getpid(), hexlify(os.urandom(8))))
+    # Chaves privadas: legíveis apenas pelo dono
+    fd = os.open(name + ".tmp", os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0600)
+    with os.fdopen(fd, "w") as f:
+        f.write("\n".join("%X" % value for value in keys))
+    os.rename(name + ".tmp", name + ".key")
+
+# @Brief Retira chaves do pool
+# O rename garante que duas execuções simultâneas nunca recebam a mesma chave.
+# Com KEY_POOL_REFILL, quando o pool fica abaixo de KEY_POOL_LOW, um reabastecimento é
+# iniciado em segundo plano (e informado).
+# @Arg1 -> Nome do tipo
+# @Return -> Chaves ou None (pool inexistente ou vazio)
+def takeKeysFromPool(kind):
+    directory = os.path.join(KEY_POOL_DIR, kind)
+    if not os.path.isdir(directory):
+        if not KEY_POOL_REFILL:
+            return None
+        # Na primeira vez o diretório é criado, para que a falta seja contada e o reabastecimento iniciado
+        try:
+            os.makedirs(directory, 0700)
+        except OSError:
+            pass
+    keys = None
+    for name in os.listdir(directory):
+        if not name.endswith(".key"):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            os.rename(path, path + ".taken")
+        except OSError:
+            continue
+        keys = tuple(int(value, 16) for value in readAllFile(path + ".taken").split())
+        os.remove(path + ".taken")
+        break
+    updateKeyPoolStats(kind, "hits" if keys else "misses")
+    if KEY_POOL_REFILL and keyPoolDepth(kind) < KEY_POOL_LOW:
+        print "\nReabastecimento do pool %s iniciado em segundo plano (processo %d)" % (kind, startKeyPoolRefill(kind))
+    return keys
+
+# @Brief Inicia, em segundo plano, um processo que reabastece o pool
+# @Arg1 -> Nome do tipo
+# @Return -> PID do processo
+def startKeyPoolRefill(kind):
+    devnull = open(os.devnull, "w")
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__), "--keypool", "fill", kind],
+                            stdout = devnull, stderr = devnull, close_fds = True).pid
+
+# @Brief Verifica se o processo de um arquivo de trava ainda está executando
+# @Arg1 -> Caminho do arquivo de trava
+# @Return -> True ou False
+def isKeyPoolLockAlive(path):
+    try:
+        os.kill(int(readAllFile(path)), 0)
+    except (OSError, ValueError):
+        return False
+    return True
+
+# @Brief Produtor: gera chaves até o pool atingir KEY_POOL_DEPTH
+# Apenas um produtor por tipo executa de cada vez (arquivo de trava "fill.lock").
+# @Arg1 -> Nome do tipo
+# @Return -> Quantidade de chaves geradas
+def fillKeyPool(kind):
+    directory = os.path.join(KEY_POOL_DIR, kind)
+    if not os.path.isdir(directory):
+        os.makedirs(directory, 0700)
+    lock = os.path.join(directory, "fill.lock")
+    if isThisFileExists(lock) and not isKeyPoolLockAlive(lock):
+        os.remove(lock)
+    try:
+        fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except OSError:
+        return 0
+    os.write(fd, str(os.getpid()))
+    os.close(fd)
+    generated = 0
+    try:
+        while keyPoolDepth(kind) < KEY_POOL_DEPTH:
+            putKeysInPool(kind, generateKeyPoolEntry(kind))
+            generated += 1
+    finally:
+        os.remove(lock)
+    return generated
+
+# @Brief Exibe a profundidade e os acertos/faltas de cada tipo do pool
+def printKeyPoolStatus():
+    if not os.path.isdir(KEY_POOL_DIR):
+        print "Pool de chaves inexistente (%s)" % KEY_POOL_DIR
+        return
+    print "Pool de chaves em %s" % KEY_POOL_DIR
+    for kind in sorted(os.listdir(KEY_POOL_DIR)):
+        stats = keyPoolStats(kind)
+        print "\t%s: %d/%d chaves, %d acertos, %d faltas" % (kind, keyPoolDepth(kind), KEY_POOL_DEPTH, stats["hits"], stats["misses"])
+
+# ===================================== Repositório de chaves =====================================  #
+
+# Um subdiretório por identificador de chave (o mesmo gravado no cabeçalho dos arquivos encriptados),
+# com um arquivo binário por par de chaves: a busca pela chave de um arquivo não depende do
+# tamanho do repositório. Chaves do El Gamal de um mesmo grupo compartilham o identificador.
+KEY_STORE_DIR = os.environ.get("KRIPTOS_KEYSTORE", os.path.expanduser("~/.kriptos-keystore"))
+KEY_STORE_MAGIC = "KKEY"
+KEY_STORE_VERSION = 1
+KEY_STORE_HEADER = struct.Struct(">4sBBB")
+KEY_STORE_VALUE = struct.Struct(">H")
+KEY_STORE_METHODS = {"rsa": ALGORITHM_RSA, "elgamal": ALGORITHM_ELGAMAL}
+
+# @Brief Codifica um par de chaves: cabeçalho e, para cada valor, tamanho e bytes
+# @Arg1 -> KeyPair
+# @Return -> Bytes
+def encodeKeyPair(keyPair):
+    data = [KEY_STORE_HEADER.pack(KEY_STORE_MAGIC, KEY_STORE_VERSION, KEY_STORE_METHODS[keyPair.method], len(keyPair.values))]
+    for value in keyPair.values:
+        width = getCipherWidth(value) or 1
+        data.append(KEY_STORE_VALUE.pack(width) + intToBytes(value, width))
+    return "".join(data)
+
+# @Brief Decodifica um par de chaves gravado por encodeKeyPair
+# @Arg1 -> Bytes
+# @Return -> KeyPair
+def decodeKeyPair(data):
+    magic, version, algorithm, count = KEY_STORE_HEADER.unpack_from(data)
+    if magic != KEY_STORE_MAGIC or version != KEY_STORE_VERSION:
+        raise ValueError("arquivo de chave inválido")
+    values, offset = [], KEY_STORE_HEADER.size
+    for i in range(0, count):
+        width = KEY_STORE_VALUE.unpack_from(data, offset)[0]
+        offset += KEY_STORE_VALUE.size
+        values.append(bytesToInt(data[offset:offset + width]))
+        offset += width
+    method = [name for name, value in KEY_STORE_METHODS.items() if value == algorithm][0]
+    return KeyPair(method, values)
+
+# @Brief Diretório das chaves de um identificador
+# @Arg1 -> Identificador da chave (keyFingerprint)
+# @Return -> Caminho do diretório
+def keyStorePath(fingerprint):
+    return os.path.join(KEY_STORE_DIR, hexlify(fingerprint))
+
+# @Brief Adiciona um par de chaves ao repositório (gravação atômica, legível só pelo dono)
+# @Arg1 -> KeyPair
+# @Return -> Caminho do arquivo da chave
+def putKeyInStore(keyPair):
+    directory = keyStorePath(keyPair.fingerprint())
+    if not os.path.isdir(directory):
+        os.makedirs(directory, 0700)
+    data = encodeKeyPair(keyPair)
+    path = os.path.join(directory, sha224(data).hexdigest()[:16] + ".key")
+    fd = os.open(path + ".tmp", os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.rename(path + ".tmp", path)
+    return path
+
+# @Brief Procura no repositório as chaves de um identificador
+# @Arg1 -> Identificador da chave (keyFingerprint, gravado no cabeçalho do contêiner)
+# @Arg2 -> Método ("rsa" ou "elgamal"), ou None para qualquer um
+# @Return -> Lista de KeyPair, da mais recente para a mais antiga
+def findKeysInStore(fingerprint, method = None):
+    directory = keyStorePath(fingerprint)
+    if not os.path.isdir(directory):
+        return []
+    paths = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".key")]
+    paths.sort(key = os.path.getmtime, reverse = True)
+    keyPairs = [decodeKeyPair(readAllFile(path)) for path in paths]
+    return [keyPair for keyPair in keyPairs if method is None or keyPair.method == method]
+
+# @Brief Procura no repositório a chave de um arquivo encriptado (pelo cabeçalho)
+# @Arg1 -> Nome/Caminho do arquivo encriptado
+# @Arg2 -> Método ("rsa" ou "elgamal")
+# @Return -> KeyPair ou None
+def findKeyForFile(path, method):
+    with open(path, "rb") as f:
+        header = readContainerHeader(f)
+    found = findKeysInStore(header[3], method) if header is not None else []
+    return found[0] if found else None
+
+# @Brief Importa arquivos de chaves no formato texto para o repositório
+# @Arg1 -> Nomes/Caminhos dos arquivos
+# @Return -> Lista de (arquivo, identificador da chave)
+def importKeyFiles(paths):
+    imported = []
+    for path in paths:
+        keyPair = KeyPair.fromFile(path)
+        putKeyInStore(keyPair)
+        imported.append((path, hexlify(keyPair.fingerprint())))
+    return imported
+
+# @Brief Exporta as chaves de um identificador para arquivos no formato texto
+# @Arg1 -> Identificador da chave, em hexadecimal
+# @Arg2 -> Nome/Caminho do arquivo (com várias chaves, recebe o sufixo -N)
+# @Return -> Lista dos arquivos gravados
+def exportKeys(fingerprint, path = None):
+    path = path or "keys-" + fingerprint + ".txt"
+    keyPairs = findKeysInStore(unhexlify(fingerprint))
+    paths = []
+    for i, keyPair in enumerate(keyPairs):
+        name = path if len(keyPairs) == 1 else "%s-%d%s" % (os.path.splitext(path)[0], i + 1, os.path.splitext(path)[1])
+        keyPair.save(name)
+        paths.append(name)
+    return paths
+
+# @Brief Mostra as chaves do repositório
+def printKeyStore():
+    if not os.path.isdir(KEY_STORE_DIR):
+        print "Repositório vazio: %s" % KEY_STORE_DIR
+        return
+    for name in sorted(os.listdir(KEY_STORE_DIR)):
+        for keyPair in findKeysInStore(unhexlify(name)):
+            print "%s  %-8s %5d bits  %d valores" % (name, keyPair.method, keyPair.values[0].bit_length(), len(keyPair.values))
+
+# ========================================= Instrumentação ========================================  #
+
+# Desativada por padrão: as funções abaixo só são substituídas por versões medidas em enableMetrics,
+# então, sem --metrics, o custo é nulo. Os tempos de cada fase são inclusivos (uma exponenciação
+# dentro da geração de primos conta nas duas fases) e, com --jobs, o que roda nos processos
+# filhos não é contabilizado.
+METRICS = None
+METRICS_INTERVAL = 1.0
+
+# (função global, fase) medidas quando a instrumentação está ativa
+METRICS_FUNCTIONS = (("generatePossiblePrime", "keygen"), ("generateSafePrime", "keygen"),
+                     ("millerRabinUnitTest", "millerRabin"), ("expMod", "modexp"),
+                     ("fixedBaseExpMod", "modexp"), ("multiExpMod", "modexp"), ("getInverse", "inverse"))
+METRICS_GENERATORS = (("fileSplit", "parse"), ("readContainerRecords", "parse"), ("readTextRecords", "parse"))
+
+# @Brief Acumula uma chamada e o seu tempo na fase
+# @Arg1 -> Fase
+# @Arg2 -> Tempo, em segundos
+def addMetric(phase, seconds):
+    counter = METRICS["phases"].setdefault(phase, [0, 0.0])
+    counter[0] += 1
+    counter[1] += seconds
+
+# @Brief Envolve uma função, medindo as chamadas e o tempo na fase
+# A função medida mantém o nome da original: ela substitui a global de mesmo nome e,
+# assim, continua podendo ser enviada (por nome) aos processos do pool.
+# @Arg1 -> Fase
+# @Arg2 -> Função
+# @Return -> Função medida
+def meteredFunction(phase, function):
+    @functools.wraps(function)
+    def metered(*args, **kwargs):
+        start = time.time()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            addMetric(phase, time.time() - start)
+    return metered
+
+# @Brief Envolve um gerador, medindo cada item produzido e o tempo gasto para produzi-lo
+# @Arg1 -> Fase
+# @Arg2 -> Função geradora
+# @Return -> Função geradora medida
+def meteredGenerator(phase, function):
+    @functools.wraps(function)
+    def metered(*args, **kwargs):
+        items = function(*args, **kwargs)
+        while True:
+            start = time.time()
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            finally:
+                addMetric(phase, time.time() - start)
+            yield item
+    return metered
+
+class MeteredFile(object):
+
+    # @Brief Arquivo que contabiliza os bytes lidos e escritos (mesmos argumentos de open)
+    def __init__(self, name, mode = "r", buffering = -1):
+        self.file = open(name, mode, buffering)
+        self.name = name
+        if "r" in mode and "+" not in mode:
+            METRICS["total"] += os.fstat(self.file.fileno()).st_size
+
+    def read(self, *args):
+        data = self.file.read(*args)
+        METRICS["read"] += len(data)
+        reportMetrics()
+        return data
+
+    def write(self, data):
+        self.file.write(data)
+        METRICS["written"] += len(data)
+        reportMetrics()
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+    def __iter__(self):
+        return iter(self.file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.file.close()
+
+# @Brief Ativa a instrumentação
+# @Arg1 -> Nome/Caminho do arquivo de métricas (uma linha JSON por evento)
+def enableMetrics(path):
+    global METRICS, openDataFile
+    start = time.time()
+    METRICS = {"start": start, "last": start, "phases": {}, "read": 0, "written": 0, "total": 0,
+               "stream": open(path, "w")}
+    for name, phase in METRICS_FUNCTIONS:
+        globals()[name] = meteredFunction(phase, globals()[name])
+    for name, phase in METRICS_GENERATORS:
+        globals()[name] = meteredGenerator(phase, globals()[name])
+    openDataFile = MeteredFile
+    atexit.register(emitMetrics, "summary")
+
+# @Brief Grava um evento com os contadores atuais e mostra o progresso
+# @Arg1 -> Tipo do evento ("progress" ou "summary")
+def emitMetrics(event):
+    now = time.time()
+    METRICS["last"] = now
+    elapsed = max(now - METRICS["start"], 1e-9)
+    record = {"event": event, "time": now, "elapsed": elapsed, "read": METRICS["read"], "written": METRICS["written"],
+              "total": METRICS["total"], "readRate": METRICS["read"] / elapsed, "writeRate": METRICS["written"] / elapsed,
+              "phases": dict((phase, {"calls": calls, "seconds": seconds}) for phase, (calls, seconds) in METRICS["phases"].items())}
+    METRICS["stream"].write(json.dumps(record) + "\n")
+    METRICS["stream"].flush()
+    done = " (%.1f%%)" % (100.0 * min(METRICS["read"], METRICS["total"]) / METRICS["total"]) if METRICS["total"] else ""
+    sys.stderr.write("\r%.1f MB lidos%s, %.1f MB escritos, %.2f MB/s " % (METRICS["read"] / 1048576.0, done,
+                     METRICS["written"] / 1048576.0, record["readRate"] / 1048576.0) + ("\n" if event == "summary" else ""))
+
+# @Brief Grava um evento de progresso se o intervalo tiver passado desde o último
+def reportMetrics():
+    if time.time() - METRICS["last"] >= METRICS_INTERVAL:
+        emitMetrics("progress")
+
+# @Brief Ativa o cProfile até o fim do programa
+# @Arg1 -> Nome/Caminho do arquivo de estatísticas (lido com pstats)
+def enableProfile(path):
+    profiler = cProfile.Profile()
+    atexit.register(lambda: (profiler.disable(), profiler.dump_stats(path)))
+    profiler.enable()
 
 # ========================================== Main methods =========================================  #
 
-def encryption(encryptionMethod, filenameToEncrypt):
-    fileToEncrypt = open(filenameToEncrypt, "rb")
-    fileEncrypted = open( "E" + fileToEncrypt.name, "w")
+# @Brief Obtém (do pool ou gerando) as chaves de encriptação e oferece salvá-las em arquivo
+# @Arg1 -> Método de encriptação ("rsa" ou "elgamal")
+# @Arg2 -> Nome do arquivo encriptado (usado no nome do arquivo de chaves)
+# @Arg3 -> Quantidade de processos
+# @Arg4 -> Tamanho, em bits, das chaves
+# @Arg5 -> Grupo pré-calculado do El Gamal
+# @Arg6 -> Se True, adiciona as chaves ao repositório de chaves
+# @Return -> (n, e, d, p, q, dP, dQ, qInv) no RSA ou (p, g, c, d) no El Gamal
+def getEncryptionKeys(encryptionMethod, filenameEncrypted, jobs = 1, bits = None, group = None, store = False):
     if encryptionMethod == "rsa":
-        n, e, d = keysRSA(generatePossiblePrime(), generatePossiblePrime())
+        keys = takeKeysFromPool(keyPoolKind("rsa", bits or 128)) or generateKeysRSA(bits or 128)
+        if store:
+            print "\nChaves adicionadas ao repositório em %s" % putKeyInStore(KeyPair(encryptionMethod, keys))
+        n, e, d = keys[:3]
+        crt = keys[3:]
         print "\nChaves criptográficas:"
         print "\tn = %s" % convertToHex(n)
         print "\te = %s" % convertToHex(e)
         print "\td = %s" % convertToHex(d)
         if makeQuestion("Gostaria de salvar as chaves em um arquivo?"):
-            keysFile = open("keys-" + encryptionMethod + "-" + changeNameExtensionsToDotKryptos(fileEncrypted.name), "w")
-            keysFile.write("n - %s\n" % convertToHex(n))
-            keysFile.write("e = %s\n" % convertToHex(e))
-            keysFile.write("d = %s\n" % convertToHex(d))
-            print "\nArquivo salvo com o nome %s" % (keysFile.name)
-        byte = fileToEncrypt.read(1)
-        byteEncripted = 0
-        while byte != "":
-            byteEncrypted = encryptionRSA(ord(byte), n, e)
-            fileEncrypted.write("%ld" % long(byteEncrypted))
-            fileEncrypted.write("-")
-            byte = fileToEncrypt.read(1)
-    elif encryptionMethod == "elgamal":
-        p, g, c, d = keysElGamal()
-        print "\nChaves criptográficas:"
-        print "\tp = %s" % convertToHex(p)
-        print "\tg = %s" % convertToHex(g)
-        print "\tc = %s" % convertToHex(c)
-        print "\td = %s" % convertToHex(d)
-        if makeQuestion("Gostaria de salvar as chaves em um arquivo?"):
-            keysFile = open("keys-" + encryptionMethod + "-" + changeNameExtensionsToDotKryptos(fileEncrypted.name), "w")
+            # Inclui os parâmetros do Teorema Chinês do Resto (decriptação mais rápida)
+            keysFile = "keys-" + encryptionMethod + "-" + changeNameExtensionsToDotKryptos(filenameEncrypted)
+            KeyPair(encryptionMethod, keys).save(keysFile)
+            print "\nArquivo salvo com o nome %s" % (keysFile)
+        return keys
+    keys = takeKeysFromPool(keyPoolKind("elgamal", bits or 255, group))
+    p, g, c, d = keys or keysElGamal(bits or 255, jobs, group)
+    if store:
+        print "\nChaves adicionadas ao repositório em %s" % putKeyInStore(KeyPair(encryptionMethod, (p, g, c, d)))
+    print "\nChaves criptográficas:"
+    print "\tp = %s" % convertToHex(p)
+    print "\tg = %s" % convertToHex(g)
+    print "\tc = %s" % convertToHex(c)
+    print "\td = %s" % convertToHex(d)
+    if makeQuestion("Gostaria de salvar as chaves em um arquivo?"):
+        keysFile = "keys-" + encryptionMethod + "-" + changeNameExtensionsToDotKryptos(filenameEncrypted)
+        KeyPair(encryptionMethod, (p, g, c, d)).save(keysFile)
+        print "\nArquivo salvo com o nome %s" % (keysFile)
+    return p, g, c, d
+
+# @Brief Encripta um arquivo em blocos no contêiner binário
+# @Arg1 -> Método de encriptação ("rsa" ou "elgamal")
+# @Arg2 -> Chaves públicas: (n, e) no RSA ou (p, g, c) no El Gamal
+# @Arg3 -> Arquivo de entrada
+# @Arg4 -> Arquivo de saída
+# @Arg5 -> Quantidade de processos
+def encryptContainer(encryptionMethod, keys, fileIn, fileOut, jobs = 1):
+    if encryptionMethod == "rsa":
+        n, e = keys
+        size, width = getBlockSize(n), getCipherWidth(n)
+        writeContainerHeader(fileOut, ALGORITHM_RSA, n, size)
+        blocks = (bytesToInt(block) for block in readBlocks(fileIn, size))
+        records = ((blockEncrypted,) for blockEncrypted in parallelMap(encryptionRSA, blocks, (n, e), jobs))
+        writeContainerRecords(fileOut, records, width)
+        return
+    p, g, c = keys
+    size, width = getBlockSize(p), getCipherWidth(p)
+    writeContainerHeader(fileOut, ALGORITHM_ELGAMAL, p, size, c)
+    blocks = (bytesToInt(block) for block in readBlocks(fileIn, size))
+    head = list(islice(blocks, FIXED_BASE_MIN_BLOCKS))
+    prepareElGamalTables(keys, len(head))
+    blocks = chain(head, blocks)
+    writeContainerRecords(fileOut, parallelMap(encryptionElGamal, blocks, (p, g, c), jobs), width)
+
+# @Brief Decripta um contêiner binário em blocos
+# @Arg1 -> Método de decriptação ("rsa" ou "elgamal")
+# @Arg2 -> Chaves: (n, e, d, parâmetros do TCR) no RSA ou (p, d, c) no El Gamal
+# @Arg3 -> Cabeçalho retornado por readContainerHeader
+# @Arg4 -> Arquivo de entrada (posicionado após o cabeçalho)
+# @Arg5 -> Arquivo de saída
+# @Arg6 -> Quantidade de processos
+# @Return -> False se o contêiner não corresponder ao método ou à chave
+def decryptContainer(decryptionMethod, keys, header, fileIn, fileOut, jobs = 1):
+    incremental = header[0] in (ALGORITHM_INCREMENTAL_RSA, ALGORITHM_INCREMENTAL_ELGAMAL)
+    components = 1 if decryptionMethod == "rsa" else 2
+    lengths = deque()
+    if incremental:
+        records = readIncrementalRecords(fileIn, header, components, lengths)
+    else:
+        records = readContainerRecords(fileIn, header[1], components)
+    if decryptionMethod == "rsa":
+        n, e, d, crt = keys
+        if not checkContainerHeader(header, ALGORITHM_INCREMENTAL_RSA if incremental else ALGORITHM_RSA, n):
+            return False
+        # Com p e q disponíveis, usa o Teorema Chinês do Resto; senão, apenas d
+        decrypt, decryptArgs = (decryptionRSACRT, (crt,)) if crt else (decryptionRSA, (n, d))
+        values = parallelMap(decrypt, (r[0] for r in records), decryptArgs, jobs)
+    else:
+        p, d, c = keys
+        if not checkContainerHeader(header, ALGORITHM_INCREMENTAL_ELGAMAL if incremental else ALGORITHM_ELGAMAL, p, c):
+            return False
+        values = parallelMap(decryptionElGamal, records, (p, d), jobs)
+    size = header[2]
+    try:
+        if incremental:
+            # O último bloco de cada fragmento é completado com zeros: mantém apenas os bytes do fragmento
+            writeBuffered(fileOut, (blockToBytes(m, size)[:lengths.popleft()] for m in values))
+        else:
+            writeUnpaddedBlocks(fileOut, (blockToBytes(m, size) for m in values))
+    except ValueError:
+        # Mesmo grupo do El Gamal, mas outra chave: o cabeçalho confere e os blocos não
+        return False
+    return True
+
+def encryption(encryptionMethod, filenameToEncrypt, jobs = 1, bits = None, group = None, hybrid = False, chunked = False, resume = False, store = False, incremental = False):
+    if chunked and resume and isThisFileExists("E" + filenameToEncrypt + ".checkpoint"):
+        print "\nRetomando a encriptação interrompida"
+        resumeChunkedEncryption(filenameToEncrypt, "E" + filenameToEncrypt)
+        return
+    with openDataFile(filenameToEncrypt, "rb", IO_BUFFER_SIZE) as fileToEncrypt, openDataFile("E" + filenameToEncrypt, "w+b", IO_BUFFER_SIZE) as fileEncrypted:
+        if encryptionMethod == "rsa":
+            n, e, d = getEncryptionKeys(encryptionMethod, fileEncrypted.name, jobs, bits, group, store)[:3]
+            if hybrid or chunked:
+                # Modo híbrido: só a chave de sessão é encriptada com o RSA
+                sessionKey = generateSessionKey(n)
+                writeContainerHeader(fileEncrypted, ALGORITHM_CHUNKED_RSA if chunked else ALGORITHM_HYBRID_RSA, n, len(sessionKey))
+                writeContainerRecord(fileEncrypted, wrapSessionKey(encryptionMethod, (n, e), sessionKey), getCipherWidth(n))
+                if chunked:
+                    encryptChunkedStream(fileToEncrypt, fileEncrypted, {"sessionKey": hexlify(sessionKey), "start": fileEncrypted.tell(), "chunks": 0, "last": None})
+                else:
+                    encryptHybridStream(fileToEncrypt, fileEncrypted, sessionKey)
+                return
+            if incremental:
+                printIncrementalStats(encryptIncremental(encryptionMethod, (n, e), fileToEncrypt, fileEncrypted, jobs))
+                return
+            encryptContainer(encryptionMethod, (n, e), fileToEncrypt, fileEncrypted, jobs)
+        elif encryptionMethod == "elgamal":
+            p, g, c, d = getEncryptionKeys(encryptionMethod, fileEncrypted.name, jobs, bits, group, store)
+            if hybrid or chunked:
+                # Modo híbrido: só a chave de sessão é encriptada com o El Gamal
+                sessionKey = generateSessionKey(p)
+                writeContainerHeader(fileEncrypted, ALGORITHM_CHUNKED_ELGAMAL if chunked else ALGORITHM_HYBRID_ELGAMAL, p, len(sessionKey), c)
+                writeContainerRecord(fileEncrypted, wrapSessionKey(encryptionMethod, (p, g, c), sessionKey), getCipherWidth(p))
+                if chunked:
+                    encryptChunkedStream(fileToEncrypt, fileEncrypted, {"sessionKey": hexlify(sessionKey), "start": fileEncrypted.tell(), "chunks": 0, "last": None})
+                else:
+                    encryptHybridStream(fileToEncrypt, fileEncrypted, sessionKey)
+                return
+            if incremental:
+                printIncrementalStats(encryptIncremental(encryptionMethod, (p, g, c), fileToEncrypt, fileEncrypted, jobs))
+                return
+            encryptContainer(encryptionMethod, (p, g, c), fileToEncrypt, fileEncrypted, jobs)
+
+# @Brief Informa quanto da encriptação incremental foi reaproveitado do cache
+# @Arg1 -> Estatísticas retornadas por encryptIncremental
+def printIncrementalStats(stats):
+    print "\nFragmentos reaproveitados do cache: %d de %d" % (stats["reused"], stats["chunks"])
+    if stats["bytes"]:
+        print "Taxa de reaproveitamento: %.1f%% (%d de %d bytes)" % (100.0 * stats["reusedBytes"] / stats["bytes"], stats["reusedBytes"], stats["bytes"])
+    if stats["evicted"]:
+        print "Entradas antigas removidas do cache: %d" % stats["evicted"]
+
+def decryption(decryptionMethod, fileToDecrypt, jobs = 1, resume = False, byteRange = None):
+    with openDataFile(fileToDecrypt, "rb", IO_BUFFER_SIZE) as fileEncrypted:
+        header = readContainerHeader(fileEncrypted)
+        # Na retomada de um contêiner em fragmentos, o arquivo parcial não pode ser truncado aqui
+        chunked = header is not None and header[0] in (ALGORITHM_CHUNKED_RSA, ALGORITHM_CHUNKED_ELGAMAL)
+        resuming = chunked and resume and byteRange is None and isThisFileExists("D" + fileToDecrypt + ".checkpoint")
+        with openDataFile("D" + fileToDecrypt, "r+b" if resuming else "wb", IO_BUFFER_SIZE) as fileDecrypted:
+            if decryptionMethod == "rsa":
+                n, e, d, crt = readDecryptionKeys(decryptionMethod, header)
+                # Com p e q disponíveis, usa o Teorema Chinês do Resto; senão, apenas d
+                if crt:
+                    decrypt, decryptArgs = decryptionRSACRT, (crt,)
+                else:
+                    decrypt, decryptArgs = decryptionRSA, (n, d)
+                print "\nIniciando decriptação"
+                if header is not None and header[0] in (ALGORITHM_HYBRID_RSA, ALGORITHM_CHUNKED_RSA):
+                    if not checkContainerHeader(header, header[0], n):
+                        print "\nO arquivo não foi encriptado com o RSA utilizando esta chave"
+                        return
+                    try:
+                        sessionKey = unwrapSessionKey(decryptionMethod, (n, e, d, crt), header, fileEncrypted)
+                    except ValueError:
+                        print "\nO arquivo não foi encriptado com o RSA utilizando esta chave"
+                        return
+                    if chunked:
+                        ok = decryptChunked(fileEncrypted, fileDecrypted, sessionKey, byteRange, resume)
+                    else:
+                        ok = decryptHybridStream(fileEncrypted, fileDecrypted, sessionKey)
+                    if not ok:
+                        fileDecrypted.close()
+                        os.remove(fileDecrypted.name)
+                        print "\nFalha na autenticação: arquivo corrompido ou chave incorreta"
+                        return
+                elif header is not None:
+                    if not decryptContainer(decryptionMethod, (n, e, d, crt), header, fileEncrypted, fileDecrypted, jobs):
+                        print "\nO arquivo não foi encriptado com o RSA utilizando esta chave"
+                        return
+                else:
+                    tokens = fileSplit(fileEncrypted)
+                    first = next(tokens, "")
+                    if first.startswith("B"):
+                        # Modo em blocos (texto): o primeiro token ("B<tamanho>") identifica o formato
+                        size = int(first[1:])
+                        values = parallelMap(decrypt, (int(i) for i in tokens), decryptArgs, jobs)
+                        writeUnpaddedBlocks(fileDecrypted, (intToBytes(m, size) for m in values))
+                    elif first:
+                        # Formato antigo: um inteiro por byte, decriptado pelo dicionário reverso
+                        codebook = legacyCodebookRSA(n, e) if e else {}
+                        decryptLegacyRSA(chain([first], tokens), fileDecrypted, codebook, decrypt, decryptArgs)
+            elif decryptionMethod == "elgamal":
+                p, d, c = readDecryptionKeys(decryptionMethod, header)
+                print "\nIniciando decriptação"
+                if header is not None and header[0] in (ALGORITHM_HYBRID_ELGAMAL, ALGORITHM_CHUNKED_ELGAMAL):
+                    if not checkContainerHeader(header, header[0], p, c):
+                        print "\nO arquivo não foi encriptado com o El Gamal utilizando esta chave"
+                        return
+                    try:
+                        sessionKey = unwrapSessionKey(decryptionMethod, (p, d, c), header, fileEncrypted)
+                    except ValueError:
+                        print "\nO arquivo não foi encriptado com o El Gamal utilizando esta chave"
+                        return
+                    if chunked:
+                        ok = decryptChunked(fileEncrypted, fileDecrypted, sessionKey, byteRange, resume)
+                    else:
+                        ok = decryptHybridStream(fileEncrypted, fileDecrypted, sessionKey)
+                    if not ok:
+                        fileDecrypted.close()
+                        os.remove(fileDecrypted.name)
+                        print "\nFalha na autenticação: arquivo corrompido ou chave incorreta"
+                        return
+                elif header is not None:
+                    if not decryptContainer(decryptionMethod, (p, d, c), header, fileEncrypted, fileDecrypted, jobs):
+                        print "\nO arquivo não foi encriptado com o El Gamal utilizando esta chave"
+                        return
+                else:
+                    writeBuffered(fileDecrypted, (chr(m) for m in parallelMap(decryptionElGamal, readTextRecords(fileEncrypted), (p, d), jobs)))
+                # Com --jobs, cada processo mantém o seu próprio cache e os contadores ficam nos filhos
+                lookups = ELGAMAL_MASK_STATS["hits"] + ELGAMAL_MASK_STATS["misses"]
+                if lookups:
+                    print "\nCache de máscaras: %d acertos em %d blocos (%.1f%%)" % (ELGAMAL_MASK_STATS["hits"], lookups, 100.0 * ELGAMAL_MASK_STATS["hits"] / lookups)
+    print "\nNome do arquivo %s" % (fileDecrypted.name)
+
+# @Brief Obtém (do pool ou gerando) as chaves de assinatura e oferece salvá-las em arquivo
+# @Arg1 -> Nome do arquivo assinado (usado no nome do arquivo de chaves)
+# @Arg2 -> Quantidade de processos
+# @Arg3 -> Tamanho, em bits, das chaves
+# @Arg4 -> Grupo pré-calculado do El Gamal
+# @Return -> (p, g, v, a)
+def getSignatureKeys(filename, jobs = 1, bits = None, group = None):
+    keys = takeKeysFromPool(keyPoolKind("elgamal", bits or 255, group))
+    p, g, v, a = keys or keysElGamal(bits or 255, jobs, group)
+    print "\nChaves de assinagura digital:"
+    print "\tp = %s" % convertToHex(p)
+    print "\tg = %s" % convertToHex(g)
+    print "\tv = %s" % convertToHex(v)
+    print "\ta = %s" % convertToHex(a)
+    if makeQuestion("Gostaria de salvar as chaves em um arquivo?"):
+        with open("keys-signature-" + changeNameExtensionsToDotKryptos(filename), "w") as keysFile:
             keysFile.write("p - %s\n" % convertToHex(p))
             keysFile.write("g = %s\n" % convertToHex(g))
-            keysFile.write("c = %s\n" % convertToHex(c))
-            keysFile.write("d = %s\n" % convertToHex(d))
-            print "\nArquivo salvo com o nome %s" % (keysFile.name)
-        byte = fileToEncrypt.read(1)
-        byteEncripted = 0
-        while byte != "":
-            byteEncrypted = encryptionElGamal(ord(byte), p, g, c)
-            fileEncrypted.write("%ld" % long(byteEncrypted[0]))
-            fileEncrypted.write("|")
-            fileEncrypted.write("%ld" % long(byteEncrypted[1]))
-            fileEncrypted.write("-")
-            byte = fileToEncrypt.read(1)
-
-def decryption(decryptionMethod, fileToDecrypt):
-    fileDecrypted = open( "D" + fileToDecrypt, "wb")
+            keysFile.write("v = %s\n" % convertToHex(v))
+            keysFile.write("a = %s\n" % convertToHex(a))
+        print "\nArquivo salvo com o nome %s" % (keysFile.name)
+    return p, g, v, a
+
+# @Brief Lê as chaves públicas de assinatura, digitadas ou de um arquivo
+# @Return -> (p, g, v)
+def readSignatureKeys():
+    if makeQuestion("Gostaria de digitar as chaves em vez de selecionar o arquivo?"):
+        print "Insira a chave de assinatura p:"
+        p = int(convertToDec(raw_input()))
+        print "insira a chave de assinatura g:"
+        g = int(convertToDec(raw_input()))
+        print "insira a chave de assinatura v:"
+        v = int(convertToDec(raw_input()))
+    else:
+        print "\nPor favor, insira o nome do arquivo"
+        keysFile = raw_input()
+        while not isThisFileExists(keysFile):
+            print "\nArquivo inexistente!"
+            print "Insira o nome correto do arquivo ou apert \"Ctrl + C\" para encerrar o programa"
+            keysFile = raw_input()
+        keys = getKeysFromFile(keysFile)
+        assert(len(keys) == 4)
+        p = keys[0]
+        g = keys[1]
+        v = keys[2]
+        print "\nChaves de assinatura encontradas:"
+        print "\tp = %s" % convertToHex(p)
+        print "\tg = %s" % convertToHex(g)
+        print "\tv = %s" % convertToHex(v)
+    return p, g, v
+
+# @Brief Obtém as chaves de decriptação do repositório (pelo identificador do cabeçalho), ou digitadas, ou de um arquivo
+# @Arg1 -> Método de decriptação ("rsa" ou "elgamal")
+# @Arg2 -> Cabeçalho do arquivo encriptado (None no formato texto)
+# @Return -> (n, e, d, parâmetros do TCR) no RSA, com e e TCR None se ausentes, ou (p, d, c) no El Gamal, com c None se ausente
+def readDecryptionKeys(decryptionMethod, header = None):
+    found = findKeysInStore(header[3], decryptionMethod) if header is not None else []
+    if found:
+        print "\nChave %s encontrada no repositório de chaves" % hexlify(header[3])
+        if len(found) > 1:
+            print "%d chaves com esse identificador; utilizando a mais recente" % len(found)
+        return found[0].decryptionKeys()
     if decryptionMethod == "rsa":
+        crt = None
+        e = None
         if makeQuestion("Gostaria de digitar as chaves em vez de selecionar o arquivo?"):
             print "Insira a chave decriptográfica n:"
             n = int(convertToDec(raw_input()))
@@ -420,94 +2663,60 @@ def decryption(decryptionMethod, fileToDecrypt):
                 print "Insira o nome correto do arquivo ou apert \"Ctrl + C\" para encerrar o programa"
                 keysFile = raw_input()
             keys = getKeysFromFile(keysFile)
-            assert(len(keys) == 3)
+            assert(len(keys) == 3 or len(keys) == 8)
             n = keys[0]
+            e = keys[1]
             d = keys[2]
+            if len(keys) == 8:
+                crt = tuple(keys[3:])
             print "\nChaves decriptográficas encontras:"
             print "\tn = %s" % convertToHex(n)
             print "\td = %s" % convertToHex(d)
-        print "\nIniciando decriptação"
-        for i in fileSplit(open(fileToDecrypt)):
-            fileDecrypted.write(chr(decryptionRSA(int(i), n, d)))
-    elif decryptionMethod == "elgamal":
-        if makeQuestion("Gostaria de digitar as chaves em vez de selecionar o arquivo?"):
-            print "Insira a chave decriptográfica p:"
-            p = int(convertToDec(raw_input()))
-            print "insira a chave decriptográfica d:"
-            d = int(onvertToDec(raw_input()))
-        else:
-            print "\nPor favor, insira o nome do arquivo"
+        return n, e, d, crt
+    if makeQuestion("Gostaria de digitar as chaves em vez de selecionar o arquivo?"):
+        print "Insira a chave decriptográfica p:"
+        p = int(convertToDec(raw_input()))
+        print "insira a chave decriptográfica d:"
+        d = int(convertToDec(raw_input()))
+        c = None
+    else:
+        print "\nPor favor, insira o nome do arquivo"
+        keysFile = raw_input()
+        while not isThisFileExists(keysFile):
+            print "\nArquivo inexistente!"
+            print "Insira o nome correto do arquivo ou apert \"Ctrl + C\" para encerrar o programa"
             keysFile = raw_input()
-            while not isThisFileExists(keysFile):
-                print "\nArquivo inexistente!"
-                print "Insira o nome correto do arquivo ou apert \"Ctrl + C\" para encerrar o programa"
-                keysFile = raw_input()
-            keys = getKeysFromFile(keysFile)
-            assert(len(keys) == 4)
-            p = keys[0]
-            d = keys[3]
-            print "\nChaves decriptográficas encontras:"
-            print "\tp = %s" % convertToHex(p)
-            print "\td = %s" % convertToHex(d)
-        print "\nIniciando decriptação"
-        for i in fileSplit(open(fileToDecrypt)):
-            itupled = i.split("|")
-            it = []
-            it.append(int(itupled[0]))
-            it.append(int(itupled[1]))
-            fileDecrypted.write(chr(decryptionElGamal(it, p, d)))
-    print "\nNome do arquivo %s" % (fileDecrypted.name)
+        keys = getKeysFromFile(keysFile)
+        assert(len(keys) == 4)
+        p = keys[0]
+        c = keys[2]
+        d = keys[3]
+        print "\nChaves decriptográficas encontras:"
+        print "\tp = %s" % convertToHex(p)
+        print "\td = %s" % convertToHex(d)
+    return p, d, c
 
-def signatureFile(filename, method):
+def signatureFile(filename, method, jobs = 1, bits = None, group = None, bufsize = HASH_BUFFER_SIZE, tree = False, chunks = None):
     if method == "sign":
         print "\nGerando chaves de assinatura..."
-        p, g, v, a = keysElGamal()
-        print "\nChaves de assinagura digital:"
-        print "\tp = %s" % convertToHex(p)
-        print "\tg = %s" % convertToHex(g)
-        print "\tv = %s" % convertToHex(v)
-        print "\ta = %s" % convertToHex(a)
-        if makeQuestion("Gostaria de salvar as chaves em um arquivo?"):
-            keysFile = open("keys-signature-" + changeNameExtensionsToDotKryptos(filename), "w")
-            keysFile.write("p - %s\n" % convertToHex(p))
-            keysFile.write("g = %s\n" % convertToHex(g))
-            keysFile.write("v = %s\n" % convertToHex(v))
-            keysFile.write("a = %s\n" % convertToHex(a))
-            print "\nArquivo salvo com o nome %s" % (keysFile.name)
-        digSign = signature(filename, p, g, a)
+        p, g, v, a = getSignatureKeys(filename, jobs, bits, group)
+        if tree:
+            digSign, hashTree = signatureTree(filename, p, g, a, jobs)
+            writeSignatureTree(signatureTreeName(filename), hashTree)
+            print "\nÁrvore de hashes (%d fragmentos) gravada em %s" % (len(hashTree[2]), signatureTreeName(filename))
+        else:
+            digSign = signature(filename, p, g, a, bufsize)
         print "\nA assinatura digital do arquivo %s é o par:"
         print "r = %s\n" % convertToHex(digSign[0])
         print "s = %s\n" % convertToHex(digSign[1])
         if makeQuestion("Gostaria de salvar a assinatura em arquivo?"):
-            digSignFile = open("signature-" + changeNameExtensionsToDotKryptos(filename), "w")
-            digSignFile.write("r = %s\n" % convertToHex(digSign[0]))
-            digSignFile.write("s = %s\n" % convertToHex(digSign[1]))
+            with open("signature-" + changeNameExtensionsToDotKryptos(filename), "w") as digSignFile:
+                digSignFile.write("r = %s\n" % convertToHex(digSign[0]))
+                digSignFile.write("s = %s\n" % convertToHex(digSign[1]))
             print "\nNome do arquivo contendo o par da assinatura é %s" % (digSignFile.name)
         print "\nAssinatura concluída"
     else:
-        if makeQuestion("Gostaria de digitar as chaves em vez de selecionar o arquivo?"):
-            print "Insira a chave de assinatura p:"
-            p = int(convertToDec(raw_input()))
-            print "insira a chave de assinatura g:"
-            g = int(convertToDec(raw_input()))
-            print "insira a chave de assinatura v:"
-            v = int(convertToDec(raw_input()))		    
-        else:
-            print "\nPor favor, insira o nome do arquivo"
-            keysFile = raw_input()
-            while not isThisFileExists(keysFile):
-                print "\nArquivo inexistente!"
-                print "Insira o nome correto do arquivo ou apert \"Ctrl + C\" para encerrar o programa"
-                keysFile = raw_input()
-            keys = getKeysFromFile(keysFile)
-            assert(len(keys) == 4)
-            p = keys[0]
-            g = keys[1]
-            v = keys[2]
-            print "\nChaves de assinatura encontradas:"
-            print "\tp = %s" % convertToHex(p)
-            print "\tg = %s" % convertToHex(g)
-            print "\tv = %s" % convertToHex(v)
+        p, g, v = readSignatureKeys()
         if makeQuestion("Gostaria de digitar os pares de assinatura em vez de selecionar o arquivo?"):
             print "Insira o primeiro componente do par da assinatura r:"
             r = int(convertToDec(raw_input()))
@@ -528,16 +2737,101 @@ def signatureFile(filename, method):
             print "\tr = %s" % convertToHex(r)
             print "\ts = %s" % convertToHex(s)
         print "\nIniciando validação de assinatura"
-        if checkSignature(filename, (r,s), p, g, v):
+        if tree:
+            checkSignatureTreeFile(filename, (r,s), p, g, v, jobs, chunks)
+        elif checkSignature(filename, (r,s), p, g, v, bufsize):
             print "\nAssinatura válida!"
         else:
             print "\nAssinatura inválida!"
         
-def encryptionAndSignatureFile(encryptionMethod, fileToEncrypt):
-    something = 0
+# @Brief Valida uma assinatura em árvore e informa os fragmentos alterados
+# @Arg1 -> Nome/Caminho do arquivo
+# @Arg2 -> Assinatura (r, s)
+# @Arg3 -> Chave pública (p)
+# @Arg4 -> Chave pública (g)
+# @Arg5 -> Chave pública (v)
+# @Arg6 -> Quantidade de processos
+# @Arg7 -> Índices dos fragmentos a verificar (None = todos)
+def checkSignatureTreeFile(filename, signature, p, g, v, jobs = 1, chunks = None):
+    treeFile = signatureTreeName(filename)
+    while not isThisFileExists(treeFile):
+        print "\nArquivo da árvore de hashes %s inexistente!" % treeFile
+        print "Insira o nome correto do arquivo ou apert \"Ctrl + C\" para encerrar o programa"
+        treeFile = raw_input()
+    hashTree = readSignatureTree(treeFile)
+    valid, corrupted = checkSignatureTree(filename, signature, p, g, v, hashTree, jobs, chunks)
+    if not valid:
+        print "\nAssinatura inválida! (a assinatura não corresponde à árvore %s)" % treeFile
+    elif corrupted:
+        chunkSize = hashTree[0]
+        size = max(hashTree[1], os.path.getsize(filename))
+        print "\nAssinatura inválida! Fragmentos alterados (%d bytes cada):" % chunkSize
+        for i in corrupted:
+            print "\tfragmento %d: bytes %d a %d" % (i, i * chunkSize, min((i + 1) * chunkSize, size) - 1)
+        print "\nPara verificar novamente apenas esses fragmentos, use --chunks %s" % formatChunkList(corrupted)
+    elif chunks is not None:
+        print "\nFragmentos %s íntegros!" % formatChunkList(sorted(set(chunks)))
+    else:
+        print "\nAssinatura válida!"
+
+# @Brief Encripta (modo híbrido) e assina um arquivo lendo-o uma única vez
+# @Arg1 -> Método de encriptação da chave de sessão ("rsa" ou "elgamal")
+# @Arg2 -> Nome do arquivo
+# @Arg3 -> Quantidade de processos
+# @Arg4 -> Tamanho, em bits, das chaves
+# @Arg5 -> Grupo pré-calculado do El Gamal
+# @Arg6 -> Se True, adiciona as chaves de encriptação ao repositório de chaves
+def encryptionAndSignatureFile(encryptionMethod, filenameToEncrypt, jobs = 1, bits = None, group = None, store = False):
+    with openDataFile(filenameToEncrypt, "rb", IO_BUFFER_SIZE) as fileToEncrypt, openDataFile("E" + filenameToEncrypt, "w+b", IO_BUFFER_SIZE) as fileEncrypted:
+        keys = getEncryptionKeys(encryptionMethod, fileEncrypted.name, jobs, bits, group, store)
+        print "\nGerando chaves de assinatura..."
+        p, g, v, a = getSignatureKeys(filenameToEncrypt, jobs, bits, group)
+        mod = keys[0]
+        sessionKey = generateSessionKey(mod)
+        algorithm = ALGORITHM_SIGNED_RSA if encryptionMethod == "rsa" else ALGORITHM_SIGNED_ELGAMAL
+        writeContainerHeader(fileEncrypted, algorithm, mod, len(sessionKey), keys[2] if encryptionMethod == "elgamal" else None)
+        writeContainerRecord(fileEncrypted, wrapSessionKey(encryptionMethod, KeyPair(encryptionMethod, keys).encryptionKeys(), sessionKey), getCipherWidth(mod))
+        # O hash do texto claro é calculado na mesma passada da encriptação
+        hasher = sha224()
+        encryptHybridStream(fileToEncrypt, fileEncrypted, sessionKey, hasher)
+        writeSignatureTrailer(fileEncrypted, signatureHash(int(hasher.hexdigest(), 16), p, g, a), p)
 
-def decryptionAndSignatureCheck(encryptionMethod, fileToDecrypt):
-    something = 0
+# @Brief Decripta e valida a assinatura de um arquivo encriptado e assinado, lendo-o uma única vez
+# @Arg1 -> Método de encriptação da chave de sessão ("rsa" ou "elgamal")
+# @Arg2 -> Nome do arquivo encriptado
+def decryptionAndSignatureCheck(decryptionMethod, fileToDecrypt):
+    algorithm = ALGORITHM_SIGNED_RSA if decryptionMethod == "rsa" else ALGORITHM_SIGNED_ELGAMAL
+    with openDataFile(fileToDecrypt, "rb", IO_BUFFER_SIZE) as fileEncrypted:
+        header = readContainerHeader(fileEncrypted)
+        trailer = readSignatureTrailer(fileEncrypted) if header is not None and header[0] == algorithm else None
+        if trailer is None:
+            print "\nO arquivo não foi encriptado e assinado com o %s" % ("RSA" if decryptionMethod == "rsa" else "El Gamal")
+            return
+        keys = readDecryptionKeys(decryptionMethod, header)
+        p, g, v = readSignatureKeys()
+        if not checkContainerHeader(header, algorithm, keys[0], keys[2] if decryptionMethod == "elgamal" else None):
+            print "\nO arquivo não foi encriptado utilizando esta chave"
+            return
+        print "\nIniciando decriptação e validação de assinatura"
+        try:
+            sessionKey = unwrapSessionKey(decryptionMethod, keys, header, fileEncrypted)
+        except ValueError:
+            print "\nO arquivo não foi encriptado utilizando esta chave"
+            return
+        with openDataFile("D" + fileToDecrypt, "wb", IO_BUFFER_SIZE) as fileDecrypted:
+            # O hash do texto claro é calculado na mesma passada da decriptação
+            hasher = sha224()
+            ok = decryptHybridStream(fileEncrypted, fileDecrypted, sessionKey, hasher, trailer[1])
+            valid = ok and checkSignatureHash(int(hasher.hexdigest(), 16), trailer[0], p, g, v)
+        if not valid:
+            os.remove(fileDecrypted.name)
+            if not ok:
+                print "\nFalha na autenticação: arquivo corrompido ou chave incorreta"
+            else:
+                print "\nAssinatura inválida!"
+            return
+        print "\nAssinatura válida!"
+        print "\nNome do arquivo %s" % (fileDecrypted.name)
 
 def identifyEncryptionMethod(arg):
     if arg == "rsa" or arg == "elgamal":
@@ -553,6 +2847,676 @@ def identifyDigSignTask(arg):
     else:
         return "desconhecida"
 
+# ========================================== Biblioteca ===========================================  #
+
+# Funções sem interação (sem print nem raw_input) para uso do programa como módulo:
+#   kriptos = imp.load_source("kriptos", "unique-file.py")
+#   keyPair = kriptos.KeyPair.generate("rsa")
+#   kriptos.encryptStream(keyPair, fileIn, fileOut)
+# Os erros são informados por ValueError.
+
+# Nomes dos valores de cada arquivo de chaves, na ordem em que são gravados
+KEY_FILE_NAMES = {"rsa": ("n", "e", "d", "p", "q", "dP", "dQ", "qInv"), "elgamal": ("p", "g", "c", "d")}
+
+# Algoritmo do contêiner de cada método e modo de encriptação
+STREAM_ALGORITHMS = {("rsa", "block"): ALGORITHM_RSA, ("rsa", "hybrid"): ALGORITHM_HYBRID_RSA,
+                     ("rsa", "incremental"): ALGORITHM_INCREMENTAL_RSA,
+                     ("elgamal", "block"): ALGORITHM_ELGAMAL, ("elgamal", "hybrid"): ALGORITHM_HYBRID_ELGAMAL,
+                     ("elgamal", "incremental"): ALGORITHM_INCREMENTAL_ELGAMAL}
+
+class KeyPair(object):
+
+    # @Brief Par de chaves de um método
+    # @Arg1 -> Método ("rsa" ou "elgamal")
+    # @Arg2 -> Valores: (n, e, d[, p, q, dP, dQ, qInv]) no RSA ou (p, g, c, d) no El Gamal
+    def __init__(self, method, values):
+        if method not in KEY_FILE_NAMES:
+            raise ValueError("método desconhecido: %s" % method)
+        self.method = method
+        self.values = tuple(values)
+
+    # @Brief Gera um novo par de chaves (sem utilizar o pool de chaves)
+    # @Arg1 -> Método ("rsa" ou "elgamal")
+    # @Arg2 -> Tamanho, em bits, das chaves
+    # @Arg3 -> Grupo pré-calculado do El Gamal
+    # @Arg4 -> Quantidade de processos
+    # @Return -> KeyPair
+    @staticmethod
+    def generate(method, bits = None, group = None, jobs = 1):
+        if method == "rsa":
+            return KeyPair(method, generateKeysRSA(bits or 128))
+        return KeyPair(method, keysElGamal(bits or 255, jobs, group))
+
+    # @Brief Lê um arquivo de chaves; o método é deduzido da quantidade de valores
+    # @Arg1 -> Nome/Caminho do arquivo
+    # @Return -> KeyPair
+    @staticmethod
+    def fromFile(path):
+        values = getKeysFromFile(path)
+        if len(values) == 3 or len(values) == 8:
+            return KeyPair("rsa", values)
+        if len(values) == 4:
+            return KeyPair("elgamal", values)
+        raise ValueError("arquivo de chaves inválido: %s" % path)
+
+    # @Brief Grava as chaves no formato lido por getKeysFromFile
+    # @Arg1 -> Nome/Caminho do arquivo
+    def save(self, path):
+        with open(path, "w") as keysFile:
+            for i, (name, value) in enumerate(zip(KEY_FILE_NAMES[self.method], self.values)):
+                keysFile.write("%s %s %X\n" % (name, "-" if i == 0 else "=", value))
+
+    # @Return -> Chaves públicas: (n, e) no RSA ou (p, g, c) no El Gamal
+    def encryptionKeys(self):
+        return self.values[:2] if self.method == "rsa" else self.values[:3]
+
+    # @Return -> (n, e, d, parâmetros do TCR ou None) no RSA ou (p, d, c) no El Gamal
+    def decryptionKeys(self):
+        if self.method == "rsa":
+            return self.values[0], self.values[1], self.values[2], self.values[3:] or None
+        return self.values[0], self.values[3], self.values[2]
+
+    # @Return -> Identificador da chave (o mesmo gravado no cabeçalho dos contêineres)
+    def fingerprint(self):
+        return keyFingerprint(self.values[0], self.values[2] if self.method == "elgamal" else None)
+
+    # @Return -> Chaves de assinatura (p, g, a); apenas El Gamal
+    def signatureKeys(self):
+        if self.method != "elgamal":
+            raise ValueError("a assinatura digital utiliza chaves do El Gamal")
+        return self.values[0], self.values[1], self.values[3]
+
+    # @Return -> Chaves de validação de assinatura (p, g, v); apenas El Gamal
+    def verificationKeys(self):
+        if self.method != "elgamal":
+            raise ValueError("a assinatura digital utiliza chaves do El Gamal")
+        return self.values[:3]
+
+# @Brief Encripta um arquivo aberto, sem interação
+# @Arg1 -> KeyPair
+# @Arg2 -> Arquivo de entrada (aberto para leitura binária)
+# @Arg3 -> Arquivo de saída (aberto para escrita binária)
+# @Arg4 -> Modo: "block" (contêiner em blocos), "hybrid" (chave de sessão e sequência cifrante)
+#           ou "incremental" (blocos em fragmentos reaproveitados do cache)
+# @Arg5 -> Quantidade de processos (apenas nos modos "block" e "incremental")
+# @Return -> Estatísticas de encryptIncremental no modo "incremental"; None nos demais
+def encryptStream(keyPair, fileIn, fileOut, mode = "block", jobs = 1):
+    algorithm = STREAM_ALGORITHMS.get((keyPair.method, mode))
+    if algorithm is None:
+        raise ValueError("modo desconhecido: %s" % mode)
+    keys = keyPair.encryptionKeys()
+    if mode == "block":
+        encryptContainer(keyPair.method, keys, fileIn, fileOut, jobs)
+        return
+    if mode == "incremental":
+        return encryptIncremental(keyPair.method, keys, fileIn, fileOut, jobs)
+    sessionKey = generateSessionKey(keys[0])
+    writeContainerHeader(fileOut, algorithm, keys[0], len(sessionKey), keys[2] if keyPair.method == "elgamal" else None)
+    writeContainerRecord(fileOut, wrapSessionKey(keyPair.method, keys, sessionKey), getCipherWidth(keys[0]))
+    encryptHybridStream(fileIn, fileOut, sessionKey)
+
+# @Brief Verifica se um arquivo aberto permite acesso aleatório (arquivo comum, não pipe ou socket)
+# @Arg1 -> Arquivo aberto
+# @Return -> True se for possível obter o tamanho e reposicionar a leitura
+def isSeekableFile(f):
+    try:
+        os.fstat(f.fileno())
+        f.seek(f.tell())
+    except (AttributeError, IOError, OSError, ValueError):
+        return False
+    return True
+
+# @Brief Decripta um arquivo aberto (contêiner em blocos, híbrido ou em fragmentos), sem interação
+# O contêiner em fragmentos exige um arquivo comum (ValueError com pipes, sockets ou StringIO);
+# os demais formatos são lidos em sequência e aceitam qualquer fluxo.
+# @Arg1 -> KeyPair
+# @Arg2 -> Arquivo de entrada (aberto para leitura binária)
+# @Arg3 -> Arquivo de saída (aberto para escrita binária)
+# @Arg4 -> Quantidade de processos (apenas no contêiner em blocos)
+def decryptStream(keyPair, fileIn, fileOut, jobs = 1):
+    header = readContainerHeader(fileIn)
+    if header is None:
+        raise ValueError("o arquivo não está no formato binário")
+    method, keys = keyPair.method, keyPair.decryptionKeys()
+    hybrid = STREAM_ALGORITHMS[(method, "hybrid")]
+    chunked = ALGORITHM_CHUNKED_RSA if method == "rsa" else ALGORITHM_CHUNKED_ELGAMAL
+    if header[0] in (STREAM_ALGORITHMS[(method, "block")], STREAM_ALGORITHMS[(method, "incremental")]):
+        if not decryptContainer(method, keys, header, fileIn, fileOut, jobs):
+            raise ValueError("o arquivo não foi encriptado utilizando esta chave")
+        return
+    if header[0] not in (hybrid, chunked):
+        raise ValueError("o arquivo não foi encriptado com o método %s" % method)
+    if not checkContainerHeader(header, header[0], keys[0], keys[2] if method == "elgamal" else None):
+        raise ValueError("o arquivo não foi encriptado utilizando esta chave")
+    sessionKey = unwrapSessionKey(method, keys, header, fileIn)
+    if header[0] == hybrid:
+        ok = decryptHybridStream(fileIn, fileOut, sessionKey)
+    else:
+        # O índice fica no fim do contêiner: o modo em fragmentos exige acesso aleatório
+        if not isSeekableFile(fileIn):
+            raise ValueError("o contêiner em fragmentos só pode ser lido de um arquivo comum, não de um fluxo")
+        # Um intervalo que cobre o arquivo inteiro dispensa o checkpoint
+        ok = decryptChunked(fileIn, fileOut, sessionKey, (0, None))
+    if not ok:
+        raise ValueError("falha na autenticação: arquivo corrompido ou chave incorreta")
+
+# @Brief Assina o conteúdo de um arquivo aberto, sem interação
+# @Arg1 -> KeyPair do El Gamal
+# @Arg2 -> Arquivo de entrada (aberto para leitura binária)
+# @Return -> Assinatura (r, s)
+def sign(keyPair, fileIn):
+    h = sha224()
+    for chunk in iter(lambda: fileIn.read(HASH_BUFFER_SIZE), ""):
+        h.update(chunk)
+    return signatureHash(int(h.hexdigest(), 16), *keyPair.signatureKeys())
+
+# @Brief Valida a assinatura do conteúdo de um arquivo aberto, sem interação
+# @Arg1 -> KeyPair do El Gamal (basta a parte pública)
+# @Arg2 -> Arquivo de entrada (aberto para leitura binária)
+# @Arg3 -> Assinatura (r, s)
+# @Return -> True se a assinatura for válida
+def verify(keyPair, fileIn, signature):
+    h = sha224()
+    for chunk in iter(lambda: fileIn.read(HASH_BUFFER_SIZE), ""):
+        h.update(chunk)
+    return checkSignatureHash(int(h.hexdigest(), 16), signature, *keyPair.verificationKeys())
+
+# @Brief Troca a extensão de um nome de arquivo (sem diretório) por .txt
+# (sem extensão, changeNameExtensionsToDotKryptos descartaria o nome inteiro)
+# @Arg1 -> Nome do arquivo
+# @Return -> Nome com a extensão .txt
+def batchTextName(name):
+    return changeNameExtensionsToDotKryptos(name) if name.rpartition(".")[0] else name + ".txt"
+
+# @Brief Nome do arquivo de saída (ou, na validação, da assinatura) de um arquivo do lote
+# @Arg1 -> Tarefa ("encrypt", "decrypt", "sign" ou "check")
+# @Arg2 -> Nome do arquivo
+# @Arg3 -> Saída: nome do arquivo, diretório ou None (como em runBatch)
+# @Arg4 -> Quantidade de arquivos do lote
+# @Return -> Nome/Caminho do arquivo de saída
+def batchTarget(task, filename, out, count):
+    directory, name = os.path.split(filename)
+    prefix = {"encrypt": "E", "decrypt": "D"}.get(task)
+    if prefix:
+        defaultName = prefix + name
+    else:
+        defaultName = "signature-" + batchTextName(name)
+    if out is None:
+        return os.path.join(directory, defaultName)
+    if count == 1 and not os.path.isdir(out):
+        return out
+    return os.path.join(out, defaultName)
+
+# @Brief Linha de comando não interativa: processa vários arquivos com as mesmas chaves
+# @Arg1 -> Tarefa ("encrypt", "decrypt", "sign" ou "check")
+# @Arg2 -> Método ("rsa" ou "elgamal"; o El Gamal na assinatura)
+# @Arg3 -> Nomes dos arquivos
+# @Arg4 -> Arquivo de chaves (lido se existir; senão, as chaves geradas são gravadas nele)
+# @Arg5 -> Saída: nome do arquivo (com um arquivo) ou diretório (com vários); None = nomes padrão
+# @Arg6 -> Modo de encriptação ("block", "hybrid" ou "incremental")
+# @Arg7 -> Quantidade de processos
+# @Arg8 -> Tamanho, em bits, das chaves geradas
+# @Arg9 -> Grupo pré-calculado do El Gamal
+# @Arg10 -> Se True, adiciona as chaves geradas na encriptação ao repositório de chaves
+# @Return -> Quantidade de arquivos com falha
+def runBatch(task, method, filenames, keyFile = None, out = None, mode = "block", jobs = 1, bits = None, group = None, store = False):
+    # Destinos verificados antes de gerar chaves ou escrever qualquer arquivo: dois arquivos
+    # com o mesmo destino fariam o segundo sobrescrever o primeiro
+    targets = [batchTarget(task, filename, out, len(filenames)) for filename in filenames]
+    if task != "check":
+        normalized = [os.path.normpath(target) for target in targets]
+        repeated = sorted(set(target for target in normalized if normalized.count(target) > 1))
+        if repeated:
+            print "Mais de um arquivo do lote seria gravado em: %s" % ", ".join(repeated)
+            return len(filenames)
+    if keyFile is not None and isThisFileExists(keyFile):
+        keyPair = KeyPair.fromFile(keyFile)
+        if keyPair.method != method:
+            print "O arquivo de chaves %s não é do método %s" % (keyFile, method)
+            return len(filenames)
+    elif task == "encrypt" or task == "sign":
+        keyPair = KeyPair.generate(method, bits, group, jobs)
+        keyFile = keyFile or "keys-" + ("signature-" if task == "sign" else method + "-E") + batchTextName(os.path.basename(filenames[0]))
+        keyPair.save(keyFile)
+        print "Chaves salvas em %s" % keyFile
+        if store and task == "encrypt":
+            print "Chaves adicionadas ao repositório em %s" % putKeyInStore(keyPair)
+    elif task == "decrypt":
+        # Sem --key-file, a chave de cada arquivo é procurada no repositório
+        keyPair = None
+    else:
+        print "A validação de assinatura exige --key-file"
+        return len(filenames)
+    # Com vários arquivos, --out é um diretório (criado se ainda não existir)
+    if out is not None and len(filenames) > 1 and not os.path.isdir(out):
+        try:
+            os.makedirs(out)
+        except OSError as error:
+            print "%s: %s" % (out, error.strerror)
+            return len(filenames)
+    failures = 0
+    for filename, target in zip(filenames, targets):
+        try:
+            with openDataFile(filename, "rb", IO_BUFFER_SIZE) as fileIn:
+                if task == "check":
+                    r, s = getKeysFromFile(target)[:2]
+                    if not verify(keyPair, fileIn, (r, s)):
+                        raise ValueError("assinatura inválida")
+                    print "%s: assinatura válida" % filename
+                    continue
+                if task == "sign":
+                    r, s = sign(keyPair, fileIn)
+                    with open(target, "w") as digSignFile:
+                        digSignFile.write("r = %X\ns = %X\n" % (r, s))
+                else:
+                    fileKeys = keyPair or findKeyForFile(filename, method)
+                    if fileKeys is None:
+                        raise ValueError("nenhuma chave para este arquivo no repositório de chaves")
+                    with openDataFile(target, "wb", IO_BUFFER_SIZE) as fileOut:
+                        try:
+                            if task == "encrypt":
+                                stats = encryptStream(fileKeys, fileIn, fileOut, mode, jobs)
+                            else:
+                                decryptStream(fileKeys, fileIn, fileOut, jobs)
+                        except ValueError:
+                            fileOut.close()
+                            os.remove(target)
+                            raise
+                if task == "encrypt" and mode == "incremental" and stats["bytes"]:
+                    print "%s -> %s (%.1f%% reaproveitado do cache)" % (filename, target, 100.0 * stats["reusedBytes"] / stats["bytes"])
+                    continue
+                print "%s -> %s" % (filename, target)
+        except (ValueError, IOError, AssertionError) as error:
+            failures += 1
+            print "%s: %s" % (filename, error)
+    return failures
+
+# =========================================== Benchmark ===========================================  #
+
+# Parâmetros padrão: a mesma semente gera os mesmos primos, chaves e arquivos em toda execução
+BENCHMARK_SEED = 1
+BENCHMARK_REPEAT = 3
+BENCHMARK_PRIME_BITS = (128, 256, 512)
+BENCHMARK_ELGAMAL_BITS = (64, 128)
+BENCHMARK_KEY_BITS = 128
+BENCHMARK_SIZES = "1K,1M"
+# Diferença tolerada em relação ao baseline antes de acusar regressão (0.25 = 25% mais lento)
+BENCHMARK_TOLERANCE = 0.25
+# Diferenças absolutas menores que esta (em segundos) são consideradas ruído de medida
+BENCHMARK_NOISE = 0.005
+
+# @Brief Converte um tamanho como "1K", "64M" ou "1G" em bytes
+# @Arg1 -> Tamanho
+# @Return -> Quantidade de bytes
+def parseSize(text):
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    text = text.strip().upper()
+    if text and text[-1] in units:
+        return int(text[:-1]) * units[text[-1]]
+    return int(text)
+
+# @Brief Gera um arquivo pseudoaleatório (reprodutível pela semente)
+# @Arg1 -> Nome/Caminho do arquivo
+# @Arg2 -> Tamanho em bytes
+# @Arg3 -> Semente
+def writeBenchmarkFile(path, size, seed):
+    random.seed(seed)
+    with open(path, "wb", IO_BUFFER_SIZE) as f:
+        while size > 0:
+            length = min(size, IO_BUFFER_SIZE)
+            f.write(intToBytes(getrandbits(8 * length), length))
+            size -= length
+
+# @Brief Descarta os resultados guardados entre chamadas (tabelas de base fixa e máscaras do El Gamal),
+# para que toda execução medida comece do mesmo estado, sem aproveitar o trabalho da anterior
+def clearMemoizedState():
+    FIXED_BASE_TABLES.clear()
+    ELGAMAL_MASK_CACHE.clear()
+    ELGAMAL_MASK_STATS["hits"] = ELGAMAL_MASK_STATS["misses"] = 0
+
+# @Brief Mede o menor tempo de várias execuções, cada uma a partir da mesma semente e sem caches
+# @Arg1 -> Semente
+# @Arg2 -> Quantidade de execuções
+# @Arg3 -> Função medida
+# @Arg4... -> Argumentos da função
+# @Return -> Tempo, em segundos, da execução mais rápida
+def timeCall(seed, repeat, function, *args):
+    best = None
+    for i in range(0, repeat):
+        clearMemoizedState()
+        random.seed(seed)
+        start = time.time()
+        function(*args)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+# @Brief Encripta e decripta um arquivo do benchmark pelo contêiner em blocos
+# @Arg1 -> "encrypt" ou "decrypt"
+# @Arg2 -> Método ("rsa" ou "elgamal")
+# @Arg3 -> Chaves (no formato de encryptContainer ou decryptContainer)
+# @Arg4 -> Arquivo de entrada
+# @Arg5 -> Arquivo de saída
+# @Arg6 -> Quantidade de processos
+def benchmarkContainer(task, method, keys, pathIn, pathOut, jobs):
+    with open(pathIn, "rb", IO_BUFFER_SIZE) as fileIn, open(pathOut, "wb", IO_BUFFER_SIZE) as fileOut:
+        if task == "encrypt":
+            encryptContainer(method, keys, fileIn, fileOut, jobs)
+        else:
+            assert(decryptContainer(method, keys, readContainerHeader(fileIn), fileIn, fileOut, jobs))
+
+# @Brief Executa o benchmark de geração de chaves, encriptação, decriptação e assinatura
+# @Arg1 -> Tamanhos dos arquivos (bytes)
+# @Arg2 -> Semente
+# @Arg3 -> Quantidade de execuções de cada medida
+# @Arg4 -> Quantidade de processos na encriptação/decriptação
+# @Return -> Resultados: nome da medida -> {"seconds": tempo[, "mbps": vazão]}
+def runBenchmark(sizes, seed = BENCHMARK_SEED, repeat = BENCHMARK_REPEAT, jobs = 1):
+    results = OrderedDict()
+    def record(name, seconds, size = None):
+        results[name] = {"seconds": seconds}
+        if size:
+            results[name]["mbps"] = size / float(1 << 20) / max(seconds, 1e-9)
+        print "%-48s %10.4f s%s" % (name, seconds, " %10.2f MB/s" % results[name]["mbps"] if size else "")
+    for bits in BENCHMARK_PRIME_BITS:
+        record("generatePossiblePrime/%d" % bits, timeCall(seed, repeat, generatePossiblePrime, bits))
+    for bits in BENCHMARK_ELGAMAL_BITS:
+        record("generatePrimeAndGeneratorToElGamal/%d" % bits, timeCall(seed, repeat, generatePrimeAndGeneratorToElGamal, bits))
+    random.seed(seed)
+    p, q = generatePossiblePrime(BENCHMARK_KEY_BITS), generatePossiblePrime(BENCHMARK_KEY_BITS)
+    record("keysRSA/%d" % BENCHMARK_KEY_BITS, timeCall(seed, repeat, keysRSA, p, q))
+    record("keysElGamal/%d" % BENCHMARK_KEY_BITS, timeCall(seed, repeat, keysElGamal, BENCHMARK_KEY_BITS))
+    random.seed(seed)
+    rsa = generateKeysRSA(BENCHMARK_KEY_BITS)
+    elgamal = keysElGamal(BENCHMARK_KEY_BITS)
+    keys = {"rsa": (rsa[:2], (rsa[0], rsa[1], rsa[2], rsa[3:])), "elgamal": (elgamal[:3], (elgamal[0], elgamal[3], elgamal[2]))}
+    directory = tempfile.mkdtemp(prefix = "kriptos-benchmark-")
+    try:
+        for size in sizes:
+            label = "%dK" % (size >> 10) if size < (1 << 20) else "%dM" % (size >> 20)
+            plain, encrypted, decrypted = [os.path.join(directory, name) for name in ("plain", "encrypted", "decrypted")]
+            writeBenchmarkFile(plain, size, seed)
+            for method in ("rsa", "elgamal"):
+                record("%s-encrypt/%s" % (method, label), timeCall(seed, repeat, benchmarkContainer, "encrypt", method, keys[method][0], plain, encrypted, jobs), size)
+                record("%s-decrypt/%s" % (method, label), timeCall(seed, repeat, benchmarkContainer, "decrypt", method, keys[method][1], encrypted, decrypted, jobs), size)
+            p, g, v, a = elgamal
+            record("signature/%s" % label, timeCall(seed, repeat, signature, plain, p, g, a))
+            random.seed(seed)
+            sig = signature(plain, p, g, a)
+            record("checkSignature/%s" % label, timeCall(seed, repeat, checkSignature, plain, sig, p, g, v))
+    finally:
+        shutil.rmtree(directory)
+    return results
+
+# @Brief Compara os resultados com um baseline salvo
+# @Arg1 -> Resultados de runBenchmark
+# @Arg2 -> Resultados do baseline
+# @Arg3 -> Diferença tolerada (fração)
+# @Return -> Lista de (medida, tempo do baseline, tempo atual) das medidas mais lentas que o tolerado
+def compareBenchmark(results, baseline, tolerance = BENCHMARK_TOLERANCE):
+    regressions = []
+    for name, result in results.items():
+        before, now = baseline.get(name, {}).get("seconds"), result["seconds"]
+        if before is not None and now > before * (1 + tolerance) and now - before > BENCHMARK_NOISE:
+            regressions.append((name, before, now))
+    return regressions
+
+# ========================================= Serviço local =========================================  #
+
+# Caminho do socket Unix do serviço (pode ser alterado pela variável KRIPTOS_SOCKET ou por --socket)
+DAEMON_SOCKET = os.environ.get("KRIPTOS_SOCKET", os.path.expanduser("~/.kriptos.sock"))
+
+# Quadro: tamanho do cabeçalho JSON e do conteúdo, seguidos dos dois
+DAEMON_FRAME = struct.Struct(">II")
+DAEMON_MAX_PAYLOAD = 64 << 20
+DAEMON_OPERATIONS = ("encrypt", "decrypt", "sign", "verify")
+
+# Pool de processos do serviço e chaves já lidas (caminho -> (data de modificação, valores))
+DAEMON_POOL = None
+DAEMON_KEY_CACHE = {}
+DAEMON_KEY_LOCK = threading.Lock()
+
+# @Brief Envia um quadro pelo socket
+# @Arg1 -> Socket conectado
+# @Arg2 -> Cabeçalho (dicionário serializável em JSON)
+# @Arg3 -> Conteúdo (bytes)
+def sendFrame(sock, header, payload = ""):
+    data = json.dumps(header)
+    sock.sendall(DAEMON_FRAME.pack(len(data), len(payload)) + data)
+    if payload:
+        sock.sendall(payload)
+
+# @Brief Recebe exatamente a quantidade de bytes pedida
+# @Arg1 -> Socket conectado
+# @Arg2 -> Quantidade de bytes
+# @Return -> Bytes recebidos ou None se a conexão for encerrada antes
+def recvExactly(sock, size):
+    parts = []
+    while size > 0:
+        data = sock.recv(min(size, IO_BUFFER_SIZE))
+        if not data:
+            return None
+        parts.append(data)
+        size -= len(data)
+    return "".join(parts)
+
+# @Brief Recebe um quadro pelo socket
+# @Arg1 -> Socket conectado
+# @Return -> (cabeçalho, conteúdo) ou None se a conexão for encerrada
+def recvFrame(sock):
+    data = recvExactly(sock, DAEMON_FRAME.size)
+    if data is None:
+        return None
+    headerSize, payloadSize = DAEMON_FRAME.unpack(data)
+    if payloadSize > DAEMON_MAX_PAYLOAD:
+        raise IOError("quadro maior que o permitido (%d bytes)" % payloadSize)
+    header = recvExactly(sock, headerSize)
+    payload = recvExactly(sock, payloadSize)
+    if header is None or payload is None:
+        return None
+    return json.loads(header), payload
+
+# @Brief Lê um arquivo de chaves uma única vez (relido apenas se for modificado)
+# @Arg1 -> Caminho do arquivo de chaves
+# @Return -> Valores do arquivo
+def loadDaemonKeys(path):
+    modified = os.path.getmtime(path)
+    with DAEMON_KEY_LOCK:
+        cached = DAEMON_KEY_CACHE.get(path)
+        if cached is None or cached[0] != modified:
+            cached = DAEMON_KEY_CACHE[path] = (modified, getKeysFromFile(path))
+    return cached[1]
+
+# @Brief Seleciona, entre os valores do arquivo de chaves, os utilizados pela operação
+# @Arg1 -> Operação (DAEMON_OPERATIONS)
+# @Arg2 -> Método ("rsa" ou "elgamal"), usado na encriptação e na decriptação
+# @Arg3 -> Valores do arquivo de chaves
+# @Return -> Chaves no formato de encryptContainer, decryptContainer, signatureHash ou checkSignatureHash
+def selectDaemonKeys(op, method, values):
+    if op == "sign":
+        assert(len(values) == 4)
+        return values[0], values[1], values[3]
+    if op == "verify":
+        assert(len(values) == 3 or len(values) == 4)
+        return tuple(values[:3])
+    if method == "rsa":
+        assert(len(values) == 3 or len(values) == 8)
+        if op == "encrypt":
+            return tuple(values[:2])
+        return values[0], values[1], values[2], tuple(values[3:]) or None
+    assert(method == "elgamal" and len(values) == 4)
+    if op == "encrypt":
+        return tuple(values[:3])
+    return values[0], values[3], values[2]
+
+# @Brief Executa uma operação do serviço (em um processo do pool)
+# Os caches por chave (tabelas de base fixa, máscaras do El Gamal) permanecem em cada processo
+# entre as requisições.
+# @Arg1 -> Tupla (operação, método, chaves, conteúdo, assinatura)
+# @Return -> (cabeçalho da resposta, conteúdo da resposta)
+def runDaemonTask(task):
+    op, method, keys, payload, signature = task
+    if op == "encrypt":
+        fileOut = StringIO()
+        encryptContainer(method, keys, StringIO(payload), fileOut)
+        return {}, fileOut.getvalue()
+    if op == "decrypt":
+        fileIn, fileOut = StringIO(payload), StringIO()
+        header = readContainerHeader(fileIn)
+        if header is None or not decryptContainer(method, keys, header, fileIn, fileOut):
+            raise ValueError("o arquivo não foi encriptado com este método utilizando esta chave")
+        return {}, fileOut.getvalue()
+    h = int(sha224(payload).hexdigest(), 16)
+    if op == "sign":
+        return {"signature": ["%X" % value for value in signatureHash(h, *keys)]}, ""
+    return {"valid": checkSignatureHash(h, signature, *keys)}, ""
+
+class DaemonRequestHandler(SocketServer.BaseRequestHandler):
+
+    # @Brief Atende as requisições de uma conexão até que o cliente a encerre
+    def handle(self):
+        while True:
+            frame = recvFrame(self.request)
+            if frame is None:
+                return
+            header, payload = frame
+            try:
+                op, method = header["op"], header.get("method")
+                if op == "ping":
+                    result, data = {}, ""
+                elif op in DAEMON_OPERATIONS:
+                    keys = selectDaemonKeys(op, method, loadDaemonKeys(header["keys"]))
+                    signature = tuple(int(value, 16) for value in header.get("signature", ()))
+                    result, data = DAEMON_POOL.apply_async(runDaemonTask, ((op, method, keys, payload, signature),)).get()
+                else:
+                    raise ValueError("operação desconhecida: %s" % op)
+                result["ok"] = True
+            except Exception as error:
+                result, data = {"ok": False, "error": str(error) or error.__class__.__name__}, ""
+            sendFrame(self.request, result, data)
+
+# @Brief Inicia o serviço no socket Unix e o mantém até Ctrl + C
+# @Arg1 -> Caminho do socket
+# @Arg2 -> Quantidade de processos do pool
+def runDaemon(path = DAEMON_SOCKET, jobs = 1):
+    global DAEMON_POOL
+    if os.path.exists(path):
+        try:
+            daemonRequest({"op": "ping"}, path = path)
+            print "O serviço já está em execução em %s" % path
+            return
+        except socket.error:
+            os.remove(path)
+    # O pool é criado antes do servidor: os processos filhos não herdam o socket
+    DAEMON_POOL = multiprocessing.Pool(max(jobs, 1), reseedWorker)
+    umask = os.umask(0077)
+    try:
+        server = SocketServer.ThreadingUnixStreamServer(path, DaemonRequestHandler)
+    finally:
+        os.umask(umask)
+    server.daemon_threads = True
+    print "Serviço em execução em %s com %d processo(s)" % (path, max(jobs, 1))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(path)
+        DAEMON_POOL.terminate()
+        DAEMON_POOL.join()
+
+# @Brief Envia uma requisição ao serviço e aguarda a resposta
+# @Arg1 -> Cabeçalho da requisição
+# @Arg2 -> Conteúdo da requisição
+# @Arg3 -> Caminho do socket
+# @Return -> (cabeçalho da resposta, conteúdo da resposta)
+def daemonRequest(header, payload = "", path = DAEMON_SOCKET):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        sendFrame(sock, header, payload)
+        frame = recvFrame(sock)
+    finally:
+        sock.close()
+    if frame is None:
+        raise IOError("conexão encerrada pelo serviço")
+    return frame
+
+# @Brief Verifica se a requisição e a resposta cabem em um quadro do serviço
+# (a encriptação pode mais que dobrar o tamanho: o El Gamal gera dois inteiros por bloco)
+# @Arg1 -> Operação (DAEMON_OPERATIONS)
+# @Arg2 -> Tamanho do arquivo de entrada, em bytes
+# @Return -> True se a operação puder ser enviada ao serviço
+def daemonPayloadFits(op, size):
+    return size * (3 if op == "encrypt" else 1) <= DAEMON_MAX_PAYLOAD
+
+# @Brief Executa no próprio processo, lendo e escrevendo em fluxo, uma operação do serviço
+# (usada para arquivos grandes demais para um quadro)
+# @Arg1 -> Operação (DAEMON_OPERATIONS)
+# @Arg2 -> Método ("rsa" ou "elgamal"), usado na encriptação e na decriptação
+# @Arg3 -> Nome do arquivo de chaves
+# @Arg4 -> Nome do arquivo
+# @Arg5 -> Assinatura em hexadecimal (apenas na validação)
+# @Return -> Cabeçalho da resposta, no mesmo formato do serviço
+def runLocalTask(op, method, keysFile, filename, signature = None):
+    keys = selectDaemonKeys(op, method, getKeysFromFile(keysFile))
+    if op == "sign":
+        return {"ok": True, "signature": ["%X" % value for value in signatureHash(hashFile(filename), *keys)]}
+    if op == "verify":
+        signature = tuple(int(value, 16) for value in signature)
+        return {"ok": True, "valid": checkSignatureHash(hashFile(filename), signature, *keys)}
+    name = ("E" if op == "encrypt" else "D") + filename
+    with openDataFile(filename, "rb", IO_BUFFER_SIZE) as fileIn, openDataFile(name, "wb", IO_BUFFER_SIZE) as fileOut:
+        if op == "encrypt":
+            encryptContainer(method, keys, fileIn, fileOut)
+            return {"ok": True}
+        header = readContainerHeader(fileIn)
+        if header is not None and decryptContainer(method, keys, header, fileIn, fileOut):
+            return {"ok": True}
+    os.remove(name)
+    return {"ok": False, "error": u"o arquivo não foi encriptado com este método utilizando esta chave"}
+
+# @Brief Cliente do serviço: processa um arquivo e salva ou mostra o resultado
+# @Arg1 -> Operação (DAEMON_OPERATIONS)
+# @Arg2 -> Método ("rsa" ou "elgamal"), usado na encriptação e na decriptação
+# @Arg3 -> Nome do arquivo
+# @Arg4 -> Nome do arquivo de chaves
+# @Arg5 -> Nome do arquivo de assinatura (apenas na validação)
+# @Arg6 -> Caminho do socket
+# @Return -> True se a operação for concluída (e, na validação, a assinatura for válida)
+def daemonClient(op, method, filename, keysFile, digSignFile = None, path = DAEMON_SOCKET):
+    header = {"op": op, "method": method, "keys": os.path.abspath(keysFile)}
+    if digSignFile is not None:
+        header["signature"] = ["%X" % value for value in getKeysFromFile(digSignFile)[:2]]
+    if daemonPayloadFits(op, os.path.getsize(filename)):
+        result, data = daemonRequest(header, readAllFile(filename), path)
+    else:
+        print "Arquivo maior que o limite do serviço (%d bytes): processando localmente" % DAEMON_MAX_PAYLOAD
+        try:
+            result, data = runLocalTask(op, method, keysFile, filename, header.get("signature")), None
+        except Exception as error:
+            # Mesmo formato das falhas relatadas pelo serviço
+            result = {"ok": False, "error": (str(error) or error.__class__.__name__).decode("utf-8")}
+    if not result["ok"]:
+        print "Erro: %s" % result["error"].encode("utf-8")
+        return False
+    if op == "encrypt" or op == "decrypt":
+        name = ("E" if op == "encrypt" else "D") + filename
+        if data is not None:
+            with open(name, "wb") as f:
+                f.write(data)
+        print "Nome do arquivo %s" % name
+    elif op == "sign":
+        with open("signature-" + changeNameExtensionsToDotKryptos(filename), "w") as digSignFile:
+            digSignFile.write("r = %s\n" % result["signature"][0])
+            digSignFile.write("s = %s\n" % result["signature"][1])
+        print "Nome do arquivo contendo o par da assinatura é %s" % (digSignFile.name)
+    else:
+        print "Assinatura válida!" if result["valid"] else "Assinatura inválida!"
+        return result["valid"]
+    return True
+
 # ============================================== Menu =============================================  #
 
 def menuBash():
@@ -560,9 +3524,151 @@ def menuBash():
     args = list(sys.argv)
     args.remove(args[0])
 
+    # --jobs N: quantidade de processos utilizados na encriptação/decriptação
+    jobs = 1
+    if "--jobs" in args:
+        index = args.index("--jobs")
+        jobs = int(args[index + 1])
+        del args[index:index + 2]
+
+    # --backend NOME: backend de aritmética modular (ARITHMETIC_BACKENDS)
+    if "--backend" in args:
+        index = args.index("--backend")
+        backend = args[index + 1]
+        del args[index:index + 2]
+        if backend not in ARITHMETIC_BACKENDS:
+            print "Backend desconhecido. Backends disponíveis: %s" % ", ".join(sorted(ARITHMETIC_BACKENDS))
+            return
+        setArithmeticBackend(backend)
+
+    # --metrics ARQUIVO: conta chamadas e tempo por fase e bytes lidos/escritos, com progresso
+    # no terminal e uma linha JSON por evento no arquivo; --profile ARQUIVO: estatísticas do cProfile
+    if "--metrics" in args:
+        index = args.index("--metrics")
+        enableMetrics(args[index + 1])
+        del args[index:index + 2]
+    if "--profile" in args:
+        index = args.index("--profile")
+        enableProfile(args[index + 1])
+        del args[index:index + 2]
+
+    # --bits N: tamanho, em bits, dos primos p e q do RSA ou de q do El Gamal (até MAX_PRIME_BITS)
+    bits = None
+    if "--bits" in args:
+        index = args.index("--bits")
+        bits = int(args[index + 1])
+        del args[index:index + 2]
+
+    # --group NOME: utiliza um grupo pré-calculado (ELGAMAL_GROUPS) no El Gamal
+    group = None
+    if "--group" in args:
+        index = args.index("--group")
+        group = args[index + 1]
+        del args[index:index + 2]
+        if group not in ELGAMAL_GROUPS:
+            print "Grupo desconhecido. Grupos disponíveis: %s" % ", ".join(sorted(ELGAMAL_GROUPS))
+            return
+
+    # --hybrid: encripta apenas uma chave de sessão com o RSA/El Gamal e o conteúdo com uma sequência cifrante
+    hybrid = "--hybrid" in args
+    if hybrid:
+        args.remove("--hybrid")
+
+    # --chunked: modo híbrido em fragmentos com índice (acesso aleatório e retomada)
+    # --resume: continua uma encriptação/decriptação em fragmentos interrompida
+    # --range INÍCIO:FIM: decripta apenas esse intervalo de bytes de um arquivo em fragmentos
+    chunked = "--chunked" in args
+    if chunked:
+        args.remove("--chunked")
+    resume = "--resume" in args
+    if resume:
+        args.remove("--resume")
+
+    # --incremental: blocos em fragmentos definidos pelo conteúdo; fragmentos já encriptados com a mesma
+    # chave são reaproveitados do cache (~/.kriptos-chunkcache ou KRIPTOS_CHUNKCACHE)
+    # --cache-limit TAMANHO: tamanho máximo do cache (ex.: 512M); as entradas usadas há mais tempo são removidas
+    incremental = "--incremental" in args
+    if incremental:
+        args.remove("--incremental")
+    if "--cache-limit" in args:
+        index = args.index("--cache-limit")
+        setChunkCacheLimit(parseSize(args[index + 1]))
+        del args[index:index + 2]
+    byteRange = None
+    if "--range" in args:
+        index = args.index("--range")
+        start, end = args[index + 1].split(":")
+        byteRange = (int(start or 0), int(end) if end else None)
+        del args[index:index + 2]
+
+    # --buffer N: tamanho do buffer de leitura no hash da assinatura (0 = mmap)
+    bufsize = HASH_BUFFER_SIZE
+    if "--buffer" in args:
+        index = args.index("--buffer")
+        bufsize = int(args[index + 1])
+        del args[index:index + 2]
+
+    # --tree: assinatura pela raiz da árvore de hashes dos fragmentos (calculados em paralelo com --jobs)
+    # --chunks LISTA: na validação em árvore, verifica apenas esses fragmentos (ex.: 3,7-9)
+    tree = "--tree" in args
+    if tree:
+        args.remove("--tree")
+    chunks = None
+    if "--chunks" in args:
+        index = args.index("--chunks")
+        chunks = parseChunkList(args[index + 1])
+        tree = True
+        del args[index:index + 2]
+
+    # Modo não interativo (--yes ou --key-file): --encrypt/--decrypt/--digsignature aceitam vários arquivos
+    # --key-file ARQUIVO: chaves lidas desse arquivo (ou gravadas nele, se ainda não existir)
+    # --out CAMINHO: arquivo de saída (com um arquivo) ou diretório de saída (com vários)
+    # --yes: não faz perguntas; as chaves geradas são gravadas em arquivo
+    keyFile = None
+    if "--key-file" in args:
+        index = args.index("--key-file")
+        keyFile = args[index + 1]
+        del args[index:index + 2]
+    out = None
+    if "--out" in args:
+        index = args.index("--out")
+        out = args[index + 1]
+        del args[index:index + 2]
+    batch = "--yes" in args or keyFile is not None
+    # --store: adiciona as chaves geradas na encriptação ao repositório de chaves
+    store = "--store" in args
+    if store:
+        args.remove("--store")
+    if "--yes" in args:
+        args.remove("--yes")
+
+    # --keypool-refill: reabastece o pool de chaves em segundo plano quando ele estiver baixo
+    if "--keypool-refill" in args:
+        args.remove("--keypool-refill")
+        enableKeyPoolRefill()
+
+    # --socket CAMINHO: socket Unix do serviço local (--daemon e --client)
+    socketPath = DAEMON_SOCKET
+    if "--socket" in args:
+        index = args.index("--socket")
+        socketPath = args[index + 1]
+        del args[index:index + 2]
+
     # Determina se o programa encerrou corretamente
     allDone = False
 
+    if batch and args and args[0] in ("--encrypt", "--decrypt", "--digsignature") and len(args) > 2:
+        task = {"--encrypt": "encrypt", "--decrypt": "decrypt"}.get(args[0]) or {"sign": "sign", "check": "check"}.get(args[1])
+        method = "elgamal" if args[0] == "--digsignature" else identifyEncryptionMethod(args[1])
+        filenames = args[2:]
+        missing = [name for name in filenames if not isThisFileExists(name)]
+        if task is None or method == "desconhecido" or missing:
+            print "Argumentos inválidos ou arquivos inexistentes: %s" % " ".join(missing or args[:2])
+            sys.exit(1)
+        if runBatch(task, method, filenames, keyFile, out, "incremental" if incremental else "hybrid" if hybrid else "block", jobs, bits, group, store):
+            sys.exit(1)
+        return
+
     # Contador do índice de argumento
     i = 0
     while not allDone:
@@ -578,7 +3684,7 @@ def menuBash():
             filenameToEncrypt = args[i]
             if isThisFileExists(filenameToEncrypt):
                 print "Encripitando o arquivo %s" % (filenameToEncrypt)
-                encryption(encryptionMethod, filenameToEncrypt)
+                encryption(encryptionMethod, filenameToEncrypt, jobs, bits, group, hybrid, chunked, resume, store, incremental)
                 print "\nArquivo encriptado\n"
             else:
                 print "Arquivo inexistente"
@@ -596,7 +3702,7 @@ def menuBash():
             filenameToDecrypt = args[i]
             if isThisFileExists(filenameToDecrypt):
                 print "Decripitando o arquivo %s\n" % (filenameToDecrypt)
-                decryption(decryptionMethod, filenameToDecrypt)
+                decryption(decryptionMethod, filenameToDecrypt, jobs, resume, byteRange)
                 print "\nArquivo decriptado\n"
             else:
                 print "Aquivo inexistente"
@@ -615,20 +3721,143 @@ def menuBash():
             if isThisFileExists(filename):
                 print "==> Assinatura Digital\n"
                 print "Realizando %s do arquivo %s" % (task, filename)
-                signatureFile(filename, method)
+                signatureFile(filename, method, jobs, bits, group, bufsize, tree, chunks)
             else:
                 print "Aquivo inexistente"
                 break
             allDone = True
     
-        elif "--combinados":
+        # --keypool fill TIPO | --keypool status
+        elif args[i] == "--keypool":
             i += 1
-            print "assinatura digital"
-            break
+            if args[i] == "fill":
+                i += 1
+                kind = args[i]
+                print "Reabastecendo o pool %s" % kind
+                print "%d chaves geradas" % fillKeyPool(kind)
+            else:
+                printKeyPoolStatus()
+            allDone = True
+
+        # --keystore import ARQUIVO... | --keystore export IDENTIFICADOR [ARQUIVO] | --keystore list
+        elif args[i] == "--keystore":
+            i += 1
+            if args[i] == "import":
+                for path, fingerprint in importKeyFiles([name for name in args[i + 1:] if isThisFileExists(name)]):
+                    print "%s -> %s" % (path, fingerprint)
+            elif args[i] == "export":
+                paths = exportKeys(args[i + 1], args[i + 2] if len(args) > i + 2 else None)
+                print "\n".join(paths) if paths else "Nenhuma chave com o identificador %s" % args[i + 1]
+            else:
+                printKeyStore()
+            allDone = True
+
+        # --selftest: compara os backends de aritmética modular
+        elif args[i] == "--selftest":
+            print "Backends: %s (em uso: %s)" % (", ".join(sorted(ARITHMETIC_BACKENDS)), ARITHMETIC_BACKEND)
+            if arithmeticSelfTest():
+                print "Todos os backends produziram os mesmos resultados"
+            else:
+                print "Backends divergentes!"
+            allDone = True
+
+        # --batchcheck MANIFESTO CHAVES [--report ARQUIVO] [--randomized]
+        elif args[i] == "--batchcheck":
+            manifest, keysFile = args[i + 1], args[i + 2]
+            if not (isThisFileExists(manifest) and isThisFileExists(keysFile)):
+                print "Aquivo inexistente"
+                break
+            keys = getKeysFromFile(keysFile)
+            assert(len(keys) == 3 or len(keys) == 4)
+            entries = readSignatureManifest(manifest)
+            print "==> Verificação em lote de %d assinaturas\n" % len(entries)
+            report = open(args[args.index("--report") + 1], "w") if "--report" in args else sys.stdout
+            valid = 0
+            for filename, ok, error in checkSignatureManifest(entries, keys[:3], jobs, bufsize, "--randomized" in args):
+                valid += ok
+                report.write(json.dumps({"file": filename, "valid": ok, "error": error}) + "\n")
+            report.write(json.dumps({"total": len(entries), "valid": valid, "invalid": len(entries) - valid}) + "\n")
+            if report is not sys.stdout:
+                report.close()
+            print "\n%d assinaturas válidas, %d inválidas" % (valid, len(entries) - valid)
+            allDone = True
+
+        # --benchmark [--sizes 1K,1M,1G] [--seed N] [--repeat N] [--report ARQUIVO] [--baseline ARQUIVO] [--tolerance X]
+        elif args[i] == "--benchmark":
+            option = lambda name, default: args[args.index(name) + 1] if name in args else default
+            seed = int(option("--seed", BENCHMARK_SEED))
+            sizes = [parseSize(size) for size in option("--sizes", BENCHMARK_SIZES).split(",")]
+            print "==> Benchmark (semente %d, backend %s)\n" % (seed, ARITHMETIC_BACKEND)
+            results = runBenchmark(sizes, seed, int(option("--repeat", BENCHMARK_REPEAT)), jobs)
+            report = {"seed": seed, "backend": ARITHMETIC_BACKEND, "jobs": jobs, "results": results}
+            if "--report" in args:
+                with open(option("--report", None), "w") as reportFile:
+                    json.dump(report, reportFile, indent = 2)
+            allDone = True
+            if "--baseline" in args:
+                with open(option("--baseline", None)) as baselineFile:
+                    baseline = json.load(baselineFile)
+                if (baseline.get("seed"), baseline.get("backend"), baseline.get("jobs")) != (seed, ARITHMETIC_BACKEND, jobs):
+                    print "\nAviso: o baseline foi medido com outra semente, backend ou quantidade de processos"
+                regressions = compareBenchmark(results, baseline["results"], float(option("--tolerance", BENCHMARK_TOLERANCE)))
+                for name, before, now in regressions:
+                    print "REGRESSÃO: %s %.4f s -> %.4f s (%+.0f%%)" % (name, before, now, 100.0 * (now / before - 1))
+                if regressions:
+                    sys.exit(1)
+                print "\nNenhuma regressão em relação ao baseline"
+
+        # --daemon: serviço local que atende encriptação, decriptação e assinatura pelo socket
+        elif args[i] == "--daemon":
+            runDaemon(socketPath, jobs)
+            allDone = True
+
+        # --client encrypt|decrypt MÉTODO ARQUIVO CHAVES | --client sign ARQUIVO CHAVES
+        # --client verify ARQUIVO CHAVES ASSINATURA
+        elif args[i] == "--client":
+            i += 1
+            op = args[i]
+            if op not in DAEMON_OPERATIONS:
+                break
+            method = None
+            if op == "encrypt" or op == "decrypt":
+                i += 1
+                method = identifyEncryptionMethod(args[i])
+                if method == "desconhecido":
+                    break
+            filename, keysFile = args[i + 1], args[i + 2]
+            digSignFile = args[i + 3] if op == "verify" else None
+            if not all(isThisFileExists(name) for name in (filename, keysFile, digSignFile or keysFile)):
+                print "Aquivo inexistente"
+                break
+            daemonClient(op, method, filename, keysFile, digSignFile, socketPath)
+            allDone = True
+
+        # --combinados encrypt|decrypt MÉTODO nomeDoArquivo
+        elif args[i] == "--combinados":
+            i += 1
+            task = args[i]
+            i += 1
+            encryptionMethod = identifyEncryptionMethod(args[i])
+            if task not in ("encrypt", "decrypt") or encryptionMethod == "desconhecido":
+                break
+            i += 1
+            filename = args[i]
+            if not isThisFileExists(filename):
+                print "Aquivo inexistente"
+                break
+            if task == "encrypt":
+                print "==> Encriptação e assinatura utilizando o método %s\n" % encryptionMethod
+                encryptionAndSignatureFile(encryptionMethod, filename, jobs, bits, group, store)
+                print "\nArquivo encriptado e assinado\n"
+            else:
+                print "==> Decriptação e validação de assinatura utilizando o método %s\n" % encryptionMethod
+                decryptionAndSignatureCheck(encryptionMethod, filename)
+            allDone = True
     
         else:
             break
     if allDone ==  False:
         print "O programa será encerrado por falta de argumentos"
 
-menuBash()
+if __name__ == "__main__":
+    menuBash()